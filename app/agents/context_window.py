@@ -0,0 +1,102 @@
+import json
+import os
+import re
+from typing import List, Optional, Sequence
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from dotenv import load_dotenv
+from ..services.metrics import CONTEXT_TRIMMED, PROMPT_TOKENS
+from ..services.result_store import result_store, handles_in
+
+load_dotenv()
+
+# Estimated prompt tokens allowed per LLM call
+TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+
+# Tool outputs that only describe metadata; once answered they are the first to go
+SEMANTIC_TOOLS = {"query_indicator_semantics"}
+
+_CJK = re.compile(r"[⺀-鿿가-힯＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap tokenizer-free estimate: one token per CJK character, four characters per token otherwise."""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def message_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, ensure_ascii=False)
+    tokens = 4 + estimate_tokens(content)
+    if getattr(message, "tool_calls", None):
+        tokens += estimate_tokens(json.dumps(message.tool_calls, ensure_ascii=False, default=str))
+    return tokens
+
+
+def _units(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups an AI message with the tool results answering it, so units can be dropped
+    without leaving a tool call or a tool result orphaned."""
+    units = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and units and isinstance(units[-1][0], AIMessage):
+            units[-1].append(message)
+        else:
+            units.append([message])
+    return units
+
+
+_ELIDED = "output elided)"
+
+
+def _elide(message: ToolMessage, owner: Optional[int] = None) -> ToolMessage:
+    # Results already compacted to a handle keep it; the data stays reachable through fetch_result
+    handles = handles_in(message.content)
+    handle = handles[0] if handles else result_store.put(message.content, owner)
+    return message.model_copy(update={"content": f"[result:{handle}] (earlier {message.name or 'tool'} {_ELIDED}"})
+
+
+def fit(messages: Sequence[BaseMessage], budget: int = TOKEN_BUDGET, scope: str = "default",
+        owner: Optional[int] = None) -> List[BaseMessage]:
+    """Returns the messages to send so that they fit the token budget.
+
+    System prompts, the latest user message and the latest step are always kept. Over budget,
+    older tool outputs are replaced by result handles (metadata dumps first), then the oldest
+    turns are dropped. The conversation state itself is never modified."""
+    messages = list(messages)
+    total = sum(message_tokens(m) for m in messages)
+    PROMPT_TOKENS.observe(total, scope=scope, stage="raw")
+    if total <= budget:
+        PROMPT_TOKENS.observe(total, scope=scope, stage="sent")
+        return messages
+
+    system = [m for m in messages if isinstance(m, SystemMessage)]
+    units = _units([m for m in messages if not isinstance(m, SystemMessage)])
+    last_human = max((i for i, u in enumerate(units) if isinstance(u[0], HumanMessage)), default=None)
+    protected = {len(units) - 1, last_human}
+
+    # 1. Older tool outputs become handles, semantic dumps first
+    candidates = [
+        (m.name not in SEMANTIC_TOOLS, i, j)
+        for i, unit in enumerate(units) if i not in protected
+        for j, m in enumerate(unit) if isinstance(m, ToolMessage) and not m.content.endswith(_ELIDED)
+    ]
+    for _, i, j in sorted(candidates):
+        if total <= budget:
+            break
+        elided = _elide(units[i][j], owner)
+        total += message_tokens(elided) - message_tokens(units[i][j])
+        units[i][j] = elided
+        CONTEXT_TRIMMED.inc(scope=scope, action="elide")
+
+    # 2. Oldest turns go next
+    dropped = set()
+    for i in range(len(units)):
+        if total <= budget:
+            break
+        if i in protected:
+            continue
+        total -= sum(message_tokens(m) for m in units[i])
+        dropped.add(i)
+        CONTEXT_TRIMMED.inc(scope=scope, action="drop")
+
+    PROMPT_TOKENS.observe(total, scope=scope, stage="sent")
+    return system + [m for i, unit in enumerate(units) if i not in dropped for m in unit]
@@ -0,0 +1,113 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+from ..db import SessionLocal
+from ..models import database as models
+from ..services import invalidation
+from ..services.semantic_catalog import scoped_catalog
+from ..services.indicator_matcher import get_matcher
+
+
+@dataclass(frozen=True)
+class AgentScope:
+    agent_id: int
+    # None when the agent has no indicators assigned: it sees the whole catalog
+    indicator_ids: Optional[FrozenSet[int]]
+
+    @property
+    def configurable(self) -> dict:
+        return {"agent_id": self.agent_id, "indicator_ids": self.indicator_ids}
+
+
+_scopes: Dict[int, AgentScope] = {}
+# Compiled base graph per checkpointer (None for the stateless one)
+_compiled: Dict[int, object] = {}
+# Agent graph per (agent id, checkpointer)
+_graphs: Dict[Tuple[int, int], object] = {}
+_lock = threading.Lock()
+
+
+def _load_scope(agent_id: int) -> AgentScope:
+    db = SessionLocal()
+    try:
+        agent = db.query(models.Agent).filter(models.Agent.id == agent_id).first()
+        if agent is None:
+            raise LookupError(f"Agent {agent_id} not found")
+        return AgentScope(agent_id, frozenset(i.id for i in agent.indicators) or None)
+    finally:
+        db.close()
+
+
+def get_scope(agent_id: int) -> AgentScope:
+    scope = _scopes.get(agent_id)
+    if scope is None:
+        scope = _load_scope(agent_id)
+        with _lock:
+            _scopes[agent_id] = scope
+    return scope
+
+
+def catalog_of(agent_id: int):
+    """Catalog view the agent's graph works on."""
+    return scoped_catalog(get_scope(agent_id).indicator_ids)
+
+
+def _base_graph(checkpointer=None):
+    key = id(checkpointer)
+    graph = _compiled.get(key)
+    if graph is None:
+        from .indicator_agent import app_graph, workflow
+        with _lock:
+            graph = _compiled.get(key)
+            if graph is None:
+                graph = _compiled[key] = app_graph if checkpointer is None else workflow.compile(checkpointer=checkpointer)
+    return graph
+
+
+def get_graph(agent_id: int, checkpointer=None):
+    """Graph answering for one agent: the shared compiled graph bound to the agent's scope,
+    so recognition and every tool only see the agent's indicators. Built once per agent;
+    raises LookupError for an unknown agent."""
+    key = (agent_id, id(checkpointer))
+    graph = _graphs.get(key)
+    if graph is None:
+        scope = get_scope(agent_id)
+        graph = _base_graph(checkpointer).with_config(configurable=scope.configurable)
+        with _lock:
+            graph = _graphs.setdefault(key, graph)
+    return graph
+
+
+def invalidate(agent_id: Optional[int] = None):
+    """Drops cached graphs of one agent (all agents when None) after its definition changed."""
+    with _lock:
+        if agent_id is None:
+            _scopes.clear()
+            _graphs.clear()
+            return
+        _scopes.pop(agent_id, None)
+        for key in [k for k in _graphs if k[0] == agent_id]:
+            del _graphs[key]
+
+
+invalidation.subscribe("agent", lambda db, agent_id: invalidate(agent_id))
+
+
+def reset():
+    """Forgets compiled graphs, e.g. when the session checkpointer is closed."""
+    with _lock:
+        _compiled.clear()
+        _graphs.clear()
+
+
+def warm(checkpointer=None) -> int:
+    """Builds the graph, catalog view and indicator matcher of every agent; returns the agent count."""
+    db = SessionLocal()
+    try:
+        agent_ids = [a.id for a in db.query(models.Agent).all()]
+    finally:
+        db.close()
+    for agent_id in agent_ids:
+        get_graph(agent_id, checkpointer)
+        get_matcher(catalog_of(agent_id))
+    return len(agent_ids)
@@ -1,102 +1,251 @@
 from typing import Annotated, TypedDict, List, Dict, Any, Sequence, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
-from ..tools.indicator_tools import query_indicator_semantics, query_indicator_value
+from ..tools.indicator_tools import (
+    query_indicator_semantics, query_indicator_value, query_indicator_values_batch, query_indicator_trend,
+    analyze_indicator_contribution, fetch_result,
+)
 from ..db import SessionLocal
 from ..models import database as models
+from ..services.indicator_matcher import match_indicators
+from ..services.semantic_catalog import Catalog, catalog_for
+from ..services import sop_index
+from ..services.io_executor import run_blocking
+from ..services.result_store import compact_message, expand, owner_of
+from ..services.llm_cache import llm_cache
+from .sop_executor import SOPExecutor
+from .context_window import fit
 import json
 import os
+import re
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Define the state
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], "The messages in the conversation"]
+    messages: Annotated[Sequence[BaseMessage], add_messages]  # The messages in the conversation
     indicators: List[str]
     sop_id: Optional[int]
-    current_task_index: int
+    current_task_index: int  # Finished tasks of the current SOP run
+    task_outputs: Optional[Dict[str, str]]  # Task name -> output while an SOP run is in progress, else None
     report: str
     next_node: str
 
 # Tools
-tools = [query_indicator_semantics, query_indicator_value]
+tools = [
+    query_indicator_semantics, query_indicator_value, query_indicator_values_batch, query_indicator_trend,
+    analyze_indicator_contribution, fetch_result,
+]
 tool_node = ToolNode(tools)
 
 # Model
-model = ChatOpenAI(model="gpt-4o", streaming=True)
+# Sampling temperature of the agent model; the provider default unless set. At 0 the
+# recognition and SOP task calls are deterministic and served from the LLM response cache
+LLM_TEMPERATURE = os.getenv("LLM_TEMPERATURE")
+model = ChatOpenAI(
+    # Streamed responses only carry token usage (read by the metrics callback) when asked for
+    model="gpt-4o", streaming=True, stream_usage=True,
+    **({"temperature": float(LLM_TEMPERATURE)} if LLM_TEMPERATURE else {}),
+)
 model_with_tools = model.bind_tools(tools)
 
+SOP_RECALL_TOP_K = 5
+sop_executor = SOPExecutor(model, tools)
+
 # Nodes
 def initialize_context(state: AgentState):
-    return {"indicators": [], "sop_id": None, "current_task_index": 0, "report": ""}
+    # Indicators, the chosen SOP and the progress of its run survive across turns of a
+    # session; the report is per question
+    return {
+        "indicators": state.get("indicators") or [],
+        "sop_id": state.get("sop_id"),
+        "current_task_index": state.get("current_task_index") or 0,
+        "task_outputs": state.get("task_outputs"),
+        "report": "",
+    }
 
-def indicator_recognition(state: AgentState):
-    last_message = state["messages"][-1].content
-    # Use LLM to extract indicators from query
-    prompt = f"Extract indicator names from this query: '{last_message}'. Return a JSON list of names."
-    response = model.invoke([HumanMessage(content=prompt)])
+def _sop_in_progress(state: AgentState) -> bool:
+    return state.get("sop_id") is not None and state.get("task_outputs") is not None
+
+def _parse_json_list(text: str) -> List[str]:
+    """Extracts a JSON list of strings from an LLM reply, tolerating code fences and prose."""
+    match = re.search(r"\[.*?\]", text, re.S)
+    if not match:
+        return []
     try:
-        indicators = json.loads(response.content)
-    except:
-        indicators = []
-    
+        values = json.loads(match.group(0))
+    except ValueError:
+        return []
+    return [str(v) for v in values if isinstance(v, (str, int, float))]
+
+def _recognition_prompt(query: str, candidates: List[str]) -> str:
+    prompt = f"Extract indicator names from this query: '{query}'. Return a JSON list of names."
+    if candidates:
+        prompt += f" Candidate indicators: {json.dumps(candidates, ensure_ascii=False)}."
+    return prompt
+
+def _resolve_indicators(reply: str, catalog: Catalog) -> List[str]:
+    indicators = []
+    for name in _parse_json_list(reply):
+        indicator = catalog.find(name)
+        if not indicator and catalog.scoped:
+            # Agents limited to their own indicators ignore anything else the LLM names
+            continue
+        resolved = indicator.name if indicator else name
+        if resolved not in indicators:
+            indicators.append(resolved)
+    return indicators
+
+def _candidates(catalog: Catalog, matched: List[str]) -> List[str]:
+    # A scoped agent has few indicators: the LLM picks among all of them when nothing matched
+    return matched or (sorted(catalog.indicators) if catalog.scoped else [])
+
+def _recognition_result(indicators: List[str]):
     if not indicators:
         return {"next_node": END}
     return {"indicators": indicators, "next_node": "sop_recall"}
 
+def _follow_up(state: AgentState):
+    # Follow-up in a session ("what about West?", "continue"): no new indicator named, the
+    # ones recognized earlier still apply. An SOP run interrupted on an earlier turn resumes
+    # from its finished tasks; otherwise the agent answers from the history
+    return {"next_node": "sop_agent" if _sop_in_progress(state) else "general_agent"}
+
+def indicator_recognition(state: AgentState, config):
+    last_message = state["messages"][-1].content
+    # Only the calling agent's indicators are searched
+    catalog = catalog_for(config)
+    # Deterministic synonym matching first; the LLM is only asked when nothing
+    # matched or a matched term is shared by several indicators
+    indicators, ambiguous = match_indicators(last_message, catalog)
+    if not indicators and state["indicators"]:
+        return _follow_up(state)
+    if not indicators or ambiguous:
+        # Answered from the response cache when repeated, if the model runs at temperature 0
+        response = llm_cache.invoke(
+            model,
+            [HumanMessage(content=_recognition_prompt(last_message, _candidates(catalog, indicators)))],
+            scope="recognition",
+        )
+        indicators = _resolve_indicators(response.content, catalog)
+    return _recognition_result(indicators)
+
+async def aindicator_recognition(state: AgentState, config):
+    last_message = state["messages"][-1].content
+    # The first use after a metadata change rebuilds the catalog snapshot from the database
+    catalog = await run_blocking(catalog_for, config)
+    indicators, ambiguous = match_indicators(last_message, catalog)
+    if not indicators and state["indicators"]:
+        return _follow_up(state)
+    if not indicators or ambiguous:
+        response = await llm_cache.ainvoke(
+            model,
+            [HumanMessage(content=_recognition_prompt(last_message, _candidates(catalog, indicators)))],
+            scope="recognition",
+        )
+        indicators = _resolve_indicators(response.content, catalog)
+    return _recognition_result(indicators)
+
+def _user_query(state: AgentState) -> str:
+    for message in reversed(state["messages"]):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return ""
+
 def sop_recall(state: AgentState):
-    db = SessionLocal()
-    try:
-        # Simplified SOP recall: match indicator name to SOP description or tasks
-        indicators = state["indicators"]
-        sop = db.query(models.SOP).filter(models.SOP.description.like(f"%{indicators[0]}%")).first()
-        if sop:
-            return {"sop_id": sop.id, "next_node": "sop_agent"}
-        else:
-            return {"next_node": "general_agent"}
-    finally:
-        db.close()
+    # Ranked retrieval over SOP names, descriptions and tasks using all recognized
+    # indicators plus the raw question
+    hits = sop_index.search(state["indicators"], _user_query(state), top_k=SOP_RECALL_TOP_K)
+    sop_ids = [sop_id for sop_id, score in hits if score >= sop_index.MIN_SCORE]
+    if not sop_ids:
+        return {"next_node": "general_agent"}
+    # The session's SOP stays chosen while it still matches; its interrupted run resumes
+    if state.get("sop_id") in sop_ids:
+        if _sop_in_progress(state):
+            return {"next_node": "sop_agent"}
+        sop_id = state["sop_id"]
+    else:
+        sop_id = sop_ids[0]
+    return {"sop_id": sop_id, "task_outputs": {}, "current_task_index": 0, "next_node": "sop_agent"}
+
+async def asop_recall(state: AgentState):
+    # In-memory index lookup, cheap enough to run on the event loop
+    return sop_recall(state)
 
-def general_agent(state: AgentState):
-    messages = state["messages"]
+def general_agent(state: AgentState, config):
+    # The full history stays in the state; each call only sends what fits the token budget
+    messages = fit(state["messages"], scope="general_agent", owner=owner_of(config))
     response = model_with_tools.invoke(messages)
     return {"messages": [response]}
 
-def sop_agent(state: AgentState):
+async def ageneral_agent(state: AgentState, config):
+    response = await model_with_tools.ainvoke(fit(state["messages"], scope="general_agent", owner=owner_of(config)))
+    return {"messages": [response]}
+
+def _load_sop_tasks(sop_id: int) -> list:
     db = SessionLocal()
     try:
-        sop = db.query(models.SOP).filter(models.SOP.id == state["sop_id"]).first()
-        tasks = sop.tasks
-        current_idx = state["current_task_index"]
-        
-        if current_idx >= len(tasks):
-            return {"next_node": END}
-        
-        task = tasks[current_idx]
-        prompt = f"Execute task: {task.name}. Details: {task.detail}. Context: {state['indicators']}"
-        # In a real SOP agent, we might loop through tools. Here we just let LLM handle the task.
-        response = model_with_tools.invoke(state["messages"] + [HumanMessage(content=prompt)])
-        
-        return {
-            "messages": [response],
-            "current_task_index": current_idx + 1,
-            "next_node": "sop_agent" if current_idx + 1 < len(tasks) else END
-        }
+        sop = db.query(models.SOP).filter(models.SOP.id == sop_id).first()
+        return list(sop.tasks)
     finally:
         db.close()
 
+def _sop_result(state: AgentState, config, tasks: list, outputs: Dict[str, str]):
+    outputs = {**(state.get("task_outputs") or {}), **outputs}
+    finished = [t for t in tasks if t.name in outputs]
+    if len(finished) < len(tasks):
+        # Checkpointed after every wave: an interrupted run resumes from here
+        return {"task_outputs": outputs, "current_task_index": len(finished)}
+    report = "\n\n".join(f"## {t.name}\n{outputs[t.name]}" for t in tasks)
+    # The conversation keeps the handles; the report carries the full data behind them
+    return {
+        "messages": [AIMessage(content=report)],
+        "current_task_index": len(tasks),
+        "task_outputs": None,
+        "report": expand(report, owner_of(config)),
+    }
+
+def sop_agent(state: AgentState, config):
+    tasks = _load_sop_tasks(state["sop_id"])
+    # One wave per step: the ready tasks run concurrently, finished tasks are skipped
+    # and feed their outputs to downstream tasks
+    outputs = sop_executor.run(tasks, _user_query(state), state["indicators"], config,
+                               done=state.get("task_outputs") or {}, one_wave=True)
+    return _sop_result(state, config, tasks, outputs)
+
+async def asop_agent(state: AgentState, config):
+    tasks = await run_blocking(_load_sop_tasks, state["sop_id"])
+    outputs = await sop_executor.arun(tasks, _user_query(state), state["indicators"], config,
+                                      done=state.get("task_outputs") or {}, one_wave=True)
+    return _sop_result(state, config, tasks, outputs)
+
+def _compact_tool_results(update, config):
+    owner = owner_of(config)
+    return {**update, "messages": [compact_message(m, owner) for m in update["messages"]]}
+
+def run_tools(state: AgentState, config):
+    # Tool results re-sent on every later turn are kept short: large ones become handles
+    return _compact_tool_results(tool_node.invoke(state, config), config)
+
+async def arun_tools(state: AgentState, config):
+    return _compact_tool_results(await tool_node.ainvoke(state, config), config)
+
 # Build Graph
 workflow = StateGraph(AgentState)
 
+# Nodes carry sync and async implementations: invoke() uses the former,
+# ainvoke()/astream() the latter without blocking the event loop
 workflow.add_node("initialize", initialize_context)
-workflow.add_node("recognition", indicator_recognition)
-workflow.add_node("sop_recall", sop_recall)
-workflow.add_node("general_agent", general_agent)
-workflow.add_node("sop_agent", sop_agent)
-workflow.add_node("tools", tool_node)
+workflow.add_node("recognition", RunnableLambda(indicator_recognition, aindicator_recognition))
+workflow.add_node("sop_recall", RunnableLambda(sop_recall, asop_recall))
+workflow.add_node("general_agent", RunnableLambda(general_agent, ageneral_agent))
+workflow.add_node("sop_agent", RunnableLambda(sop_agent, asop_agent))
+workflow.add_node("tools", RunnableLambda(run_tools, arun_tools))
 
 workflow.set_entry_point("initialize")
 workflow.add_edge("initialize", "recognition")
@@ -106,6 +255,8 @@ def route_after_recognition(state):
 
 workflow.add_conditional_edges("recognition", route_after_recognition, {
     "sop_recall": "sop_recall",
+    "general_agent": "general_agent",
+    "sop_agent": "sop_agent",
     END: END
 })
 
@@ -124,7 +275,10 @@ def route_agent(state):
     return END
 
 workflow.add_conditional_edges("general_agent", route_agent)
-workflow.add_conditional_edges("sop_agent", route_agent)
+def route_after_sop_agent(state):
+    return "sop_agent" if state.get("task_outputs") is not None else END
+
+workflow.add_conditional_edges("sop_agent", route_after_sop_agent, {"sop_agent": "sop_agent", END: END})
 workflow.add_edge("tools", "general_agent") # For simplicity, both return to general for now
 
 # Compile
@@ -0,0 +1,96 @@
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from ..services import metrics
+from .streaming import NODES
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records node, tool and LLM timings plus token usage into the metrics registry,
+    and keeps a per-run breakdown that can be returned with the response."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._starts: Dict[UUID, tuple] = {}
+        self.breakdown: Dict[str, float] = {}
+        self.tokens: Dict[str, int] = {"prompt": 0, "completion": 0}
+
+    def _add(self, stage: str, seconds: float):
+        self.breakdown[stage] = self.breakdown.get(stage, 0.0) + seconds
+
+    def _finish(self, run_id: UUID) -> Optional[tuple]:
+        entry = self._starts.pop(run_id, None)
+        if entry is None:
+            return None
+        kind, name, start = entry
+        return kind, name, time.perf_counter() - start
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: UUID = None, metadata=None, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name not in NODES or (metadata or {}).get("langgraph_node") != name:
+            return
+        # Nodes wrapping a RunnableLambda report twice; time the outer run only
+        parent = self._starts.get(parent_run_id)
+        if parent and parent[0] == "node" and parent[1] == name:
+            return
+        self._starts[run_id] = ("node", name, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if finished and finished[0] == "node":
+            metrics.NODE_SECONDS.observe(finished[2], node=finished[1])
+            self._add(f"node:{finished[1]}", finished[2])
+
+    on_chain_error = on_chain_end
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any):
+        self._starts[run_id] = ("tool", kwargs.get("name") or (serialized or {}).get("name"), time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if finished:
+            metrics.TOOL_SECONDS.observe(finished[2], tool=finished[1])
+            self._add(f"tool:{finished[1]}", finished[2])
+
+    on_tool_error = on_tool_end
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "llm")
+        self._starts[run_id] = ("llm", model, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if not finished:
+            return
+        _, model, seconds = finished
+        metrics.LLM_SECONDS.observe(seconds, model=model)
+        self._add("llm", seconds)
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if prompt is None and response.generations and response.generations[0]:
+            message = getattr(response.generations[0][0], "message", None)
+            usage_metadata = getattr(message, "usage_metadata", None) or {}
+            prompt, completion = usage_metadata.get("input_tokens"), usage_metadata.get("output_tokens")
+        for kind, count in (("prompt", prompt), ("completion", completion)):
+            if count:
+                metrics.LLM_TOKENS.inc(count, model=model, kind=kind)
+                self.tokens[kind] += count
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if finished:
+            metrics.LLM_SECONDS.observe(finished[2], model=finished[1])
+            self._add("llm", finished[2])
+
+    def summary(self, total_seconds: float) -> Dict[str, Any]:
+        stages = {k: round(v, 4) for k, v in sorted(self.breakdown.items())}
+        node_total = sum(v for k, v in self.breakdown.items() if k.startswith("node:"))
+        return {
+            "total_seconds": round(total_seconds, 4),
+            "graph_overhead_seconds": round(max(total_seconds - node_total, 0.0), 4),
+            "stages": stages,
+            "tokens": dict(self.tokens),
+        }
@@ -0,0 +1,63 @@
+import asyncio
+import os
+from typing import Optional
+import aiosqlite
+from dotenv import load_dotenv
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from . import graph_registry
+from ..services.io_executor import run_blocking
+
+load_dotenv()
+
+# Local SQLite file holding the LangGraph checkpoints of chat sessions
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "./sessions.db")
+
+_checkpointer: Optional[AsyncSqliteSaver] = None
+_lock = asyncio.Lock()
+
+
+def thread_id(agent_id: int, session_id: str) -> str:
+    # Sessions are scoped to the agent they were started with
+    return f"{agent_id}:{session_id}"
+
+
+def session_config(agent_id: int, session_id: str, **config) -> dict:
+    configurable = {**config.pop("configurable", {}), "thread_id": thread_id(agent_id, session_id)}
+    return {**config, "configurable": configurable}
+
+
+async def get_checkpointer() -> AsyncSqliteSaver:
+    global _checkpointer
+    async with _lock:
+        if _checkpointer is None:
+            saver = AsyncSqliteSaver(await aiosqlite.connect(SESSION_DB_PATH))
+            await saver.setup()
+            _checkpointer = saver
+    return _checkpointer
+
+
+async def get_session_graph(agent_id: int):
+    """The agent's graph compiled with the session checkpointer: state (indicators, chosen SOP,
+    task progress, messages and tool results) is restored for every call on the same thread."""
+    checkpointer = await get_checkpointer()
+    # Loading the agent's scope the first time is a metadata database read
+    return await run_blocking(graph_registry.get_graph, agent_id, checkpointer)
+
+
+async def get_session(agent_id: int, session_id: str) -> Optional[dict]:
+    graph = await get_session_graph(agent_id)
+    snapshot = await graph.aget_state(session_config(agent_id, session_id))
+    return snapshot.values or None
+
+
+async def delete_session(agent_id: int, session_id: str):
+    checkpointer = await get_checkpointer()
+    await checkpointer.adelete_thread(thread_id(agent_id, session_id))
+
+
+async def close():
+    global _checkpointer
+    if _checkpointer is not None:
+        await _checkpointer.conn.close()
+        graph_registry.reset()
+    _checkpointer = None
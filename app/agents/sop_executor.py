@@ -0,0 +1,179 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Sequence
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from ..services.sop_dag import resolve_dependencies, topological_order
+from ..services.result_store import compact_message, handles_in, owner_of
+from ..services.llm_cache import llm_cache
+from .context_window import fit
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_WORKERS = int(os.getenv("SOP_MAX_WORKERS", "4"))
+MAX_TOOL_STEPS = int(os.getenv("SOP_TASK_MAX_STEPS", "6"))
+
+
+class SOPExecutor:
+    """Runs the tasks of an SOP as a dependency DAG.
+
+    Tasks whose dependencies are satisfied run concurrently on a bounded thread pool;
+    each task runs its own LLM/tool loop and receives the outputs of its upstream
+    tasks in its prompt. With a model configured at temperature 0, a repeated prompt is
+    answered from the LLM response cache."""
+
+    def __init__(self, model, tools: Sequence, max_workers: int = MAX_WORKERS, max_tool_steps: int = MAX_TOOL_STEPS,
+                 cache=llm_cache):
+        self.model = model
+        self.tools = {t.name: t for t in tools}
+        self.max_workers = max_workers
+        self.max_tool_steps = max_tool_steps
+        self.cache = cache
+
+    def _model_for(self, task):
+        # Restrict the task to its configured tools, if any
+        names = [n for n in (task.tools or []) if n in self.tools]
+        return self.model.bind_tools([self.tools[n] for n in names or self.tools])
+
+    def build_prompt(self, task, question: str, indicators: List[str], upstream: Dict[str, str]) -> List[BaseMessage]:
+        prompt = f"Execute task: {task.name}. Details: {task.detail}. Context: {indicators}"
+        if upstream:
+            prompt += "\n\nResults of upstream tasks:\n" + "\n".join(
+                f"[{name}]\n{output}" for name, output in upstream.items()
+            )
+        return [HumanMessage(content=question), HumanMessage(content=prompt)]
+
+    @staticmethod
+    def _finish(messages: List[BaseMessage]) -> str:
+        """Task output, followed by the handles of the results it read so the report can include them."""
+        last = messages[-1]
+        output = last.content if isinstance(last, AIMessage) else "Task stopped: too many tool calls."
+        handles = [
+            h for m in messages if isinstance(m, ToolMessage) for h in handles_in(m.content) if h not in output
+        ]
+        return output + "\n" + " ".join(f"[result:{h}]" for h in dict.fromkeys(handles)) if handles else output
+
+    def run_task(self, task, question: str, indicators: List[str], upstream: Dict[str, str],
+                 config: Optional[dict] = None) -> str:
+        model = self._model_for(task)
+        messages = self.build_prompt(task, question, indicators, upstream)
+        for _ in range(self.max_tool_steps):
+            response = self.cache.invoke(
+                model, fit(messages, scope="sop_task", owner=owner_of(config)), scope="sop_task"
+            )
+            messages.append(response)
+            if not response.tool_calls:
+                break
+            for call in response.tool_calls:
+                tool = self.tools.get(call["name"])
+                if tool is None:
+                    messages.append(ToolMessage(content=f"Unknown tool '{call['name']}'.", tool_call_id=call["id"]))
+                    continue
+                # Large results stay server-side; the task only sees a handle and a summary
+                messages.append(compact_message(tool.invoke({**call, "type": "tool_call"}, config), owner_of(config)))
+        return self._finish(messages)
+
+    async def _acall_tool(self, call, config: Optional[dict] = None) -> ToolMessage:
+        tool = self.tools.get(call["name"])
+        if tool is None:
+            return ToolMessage(content=f"Unknown tool '{call['name']}'.", tool_call_id=call["id"])
+        return compact_message(await tool.ainvoke({**call, "type": "tool_call"}, config), owner_of(config))
+
+    async def arun_task(self, task, question: str, indicators: List[str], upstream: Dict[str, str],
+                        config: Optional[dict] = None) -> str:
+        model = self._model_for(task)
+        messages = self.build_prompt(task, question, indicators, upstream)
+        for _ in range(self.max_tool_steps):
+            response = await self.cache.ainvoke(
+                model, fit(messages, scope="sop_task", owner=owner_of(config)), scope="sop_task"
+            )
+            messages.append(response)
+            if not response.tool_calls:
+                break
+            # Tool calls of one step are independent of each other
+            messages.extend(await asyncio.gather(*(self._acall_tool(call, config) for call in response.tool_calls)))
+        return self._finish(messages)
+
+    @staticmethod
+    def _unresolved(tasks: Sequence, error: ValueError) -> Dict[str, str]:
+        # A stored SOP with broken dependencies fails its tasks, not the whole request
+        return {task.name: f"Task failed: {error}" for task in tasks}
+
+    @staticmethod
+    def _plan(tasks: Sequence, deps, done: Dict[str, str], one_wave: bool):
+        """Outputs of the tasks finished earlier (by position) and the positions to run now."""
+        outputs = {i: done[t.name] for i, t in enumerate(tasks) if t.name in done}
+        pending = [i for i in topological_order(tasks, deps) if i not in outputs]
+        if one_wave:
+            pending = [i for i in pending if deps[i] <= outputs.keys()]
+        return outputs, pending
+
+    async def arun(self, tasks: Sequence, question: str, indicators: List[str],
+                   config: Optional[dict] = None, done: Optional[Dict[str, str]] = None,
+                   one_wave: bool = False) -> Dict[str, str]:
+        """Async variant of run: one asyncio task per SOP task, at most max_workers running."""
+        try:
+            deps = resolve_dependencies(tasks)
+        except ValueError as e:
+            return self._unresolved(tasks, e)
+        semaphore = asyncio.Semaphore(self.max_workers)
+        outputs, pending = self._plan(tasks, deps, done or {}, one_wave)
+        futures: Dict[int, asyncio.Task] = {}
+
+        async def run_one(i: int) -> str:
+            await asyncio.gather(*(futures[j] for j in deps[i] if j in futures))
+            upstream = {tasks[j].name: outputs[j] for j in sorted(deps[i])}
+            async with semaphore:
+                try:
+                    output = await self.arun_task(tasks[i], question, indicators, upstream, config)
+                except Exception as e:
+                    output = f"Task failed: {e}"
+            outputs[i] = output
+            return output
+
+        # Created in topological order so every upstream future already exists
+        for i in pending:
+            futures[i] = asyncio.ensure_future(run_one(i))
+        await asyncio.gather(*futures.values())
+        return {tasks[i].name: outputs[i] for i in futures}
+
+    def run(self, tasks: Sequence, question: str, indicators: List[str],
+            config: Optional[dict] = None, done: Optional[Dict[str, str]] = None,
+            one_wave: bool = False) -> Dict[str, str]:
+        """Executes the tasks and returns {task name: output} of the ones it ran, in completion order.
+        config is passed to every tool call (it carries the calling agent's scope).
+
+        Tasks in done (name -> output of an earlier run) are skipped and feed their output
+        to downstream tasks; with one_wave only the tasks that are ready right away run."""
+        try:
+            deps = resolve_dependencies(tasks)
+        except ValueError as e:
+            return self._unresolved(tasks, e)
+        outputs, pending = self._plan(tasks, deps, done or {}, one_wave)
+        waiting = {i: deps[i] - outputs.keys() for i in pending}
+        ran: List[int] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+
+            def submit_ready():
+                for i in [i for i, d in waiting.items() if not d]:
+                    del waiting[i]
+                    upstream = {tasks[j].name: outputs[j] for j in sorted(deps[i])}
+                    running[pool.submit(self.run_task, tasks[i], question, indicators, upstream, config)] = i
+
+            submit_ready()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    i = running.pop(fut)
+                    try:
+                        outputs[i] = fut.result()
+                    except Exception as e:
+                        outputs[i] = f"Task failed: {e}"
+                    ran.append(i)
+                    for d in waiting.values():
+                        d.discard(i)
+                if not one_wave:
+                    submit_ready()
+        return {tasks[i].name: outputs[i] for i in ran}
@@ -0,0 +1,45 @@
+from typing import Any, AsyncIterator, Dict, Optional
+from langchain_core.messages import BaseMessage
+
+# Graph nodes reported as progress events
+NODES = {"initialize", "recognition", "sop_recall", "general_agent", "sop_agent", "tools"}
+
+
+def _content(value: Any) -> Any:
+    if isinstance(value, BaseMessage):
+        return value.content
+    return value if isinstance(value, (str, int, float, bool, type(None), list, dict)) else str(value)
+
+
+async def stream_agent_events(graph, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Translates graph.astream_events into compact client events:
+    node_start / node_end, tool_call / tool_result, token (LLM deltas) and a final done."""
+    final_state = None
+    async for event in graph.astream_events(state, config=config, version="v2"):
+        kind = event["event"]
+        name = event.get("name")
+        node = event.get("metadata", {}).get("langgraph_node")
+        # Direct children of the graph run are the node invocations themselves
+        is_node = name in NODES and node == name and len(event.get("parent_ids", [])) == 1
+
+        if kind == "on_chain_start" and is_node:
+            yield {"type": "node_start", "node": name}
+        elif kind == "on_chain_end" and is_node:
+            yield {"type": "node_end", "node": name}
+        elif kind == "on_tool_start":
+            yield {"type": "tool_call", "tool": name, "args": event["data"].get("input")}
+        elif kind == "on_tool_end":
+            yield {"type": "tool_result", "tool": name, "content": _content(event["data"].get("output"))}
+        elif kind == "on_chat_model_stream":
+            delta = event["data"]["chunk"].content
+            if delta:
+                yield {"type": "token", "node": node, "content": delta}
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            final_state = event["data"].get("output")
+
+    messages = (final_state or {}).get("messages", [])
+    yield {
+        "type": "done",
+        "result": messages[-1].content if messages else "",
+        "report": (final_state or {}).get("report", ""),
+    }
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from .models.database import Base
 
@@ -9,8 +9,28 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+# Columns added to tables that existing databases already have; create_all only creates
+# missing tables, so these are added in place (all nullable, existing rows read NULL)
+ADDED_COLUMNS = {
+    "indicators": ["cache_ttl"],
+    "indicator_rollups": ["invalid_reason"],
+}
+
+def _add_missing_columns(bind):
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table_name, column_names in ADDED_COLUMNS.items():
+            existing = {c["name"] for c in inspector.get_columns(table_name)}
+            for name in column_names:
+                if name in existing:
+                    continue
+                column = Base.metadata.tables[table_name].c[name]
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"))
+
+def init_db(bind=engine):
+    Base.metadata.create_all(bind=bind)
+    _add_missing_columns(bind)
 
 def get_db():
     db = SessionLocal()
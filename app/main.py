@@ -1,17 +1,44 @@
+import time
+_import_start = time.perf_counter()
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from .db import init_db, get_db
 from .schemas import schemas
-from .services import metadata_service
-from .agents.indicator_agent import app_graph
-from langchain_core.messages import HumanMessage
+from .services import metadata_service, engine_registry, invalidation, metrics, rollups, sql_builder
+from .services.result_cache import indicator_value_cache
+from .services.single_flight import indicator_value_flight
+from .services.result_store import result_store
+from .services.io_executor import run_blocking
+from .services.admission import admission, Overloaded, QUERY_TIMEOUT, classify, deadline_after, iterate_until
+from .agents import graph_registry
+from .warmup import warmup
+from typing import Optional
+import asyncio
+import json
 import uvicorn
 
+# LangChain, LangGraph, pandas and the agent modules are imported by the warmup in the
+# background (or by the first request that needs them), not here
+warmup.record_import("app.main", time.perf_counter() - _import_start)
+
 app = FastAPI(title="Indicator AI Agent System")
 
 @app.on_event("startup")
 def startup():
     init_db()
+    # Catalog, SOP index, connection pools and one graph per agent are built in the
+    # background so the worker accepts connections right away; see /ready
+    warmup.start()
+    # Metadata changes made through other worker processes
+    invalidation.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    invalidation.stop()
+    engine_registry.dispose_all()
+    from .agents import sessions
+    await sessions.close()
 
 # Data Source Endpoints
 @app.post("/data_sources/", response_model=schemas.DataSource)
@@ -22,25 +49,93 @@ def create_data_source(ds: schemas.DataSourceCreate, db: Session = Depends(get_d
 def get_data_sources(db: Session = Depends(get_db)):
     return metadata_service.get_data_sources(db)
 
+@app.put("/data_sources/{ds_id}", response_model=schemas.DataSource)
+def update_data_source(ds_id: int, ds: schemas.DataSourceCreate, db: Session = Depends(get_db)):
+    db_ds = metadata_service.update_data_source(db, ds_id, ds)
+    if not db_ds:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    return db_ds
+
+@app.delete("/data_sources/{ds_id}")
+def delete_data_source(ds_id: int, db: Session = Depends(get_db)):
+    if not metadata_service.delete_data_source(db, ds_id):
+        raise HTTPException(status_code=404, detail="Data source not found")
+    return {"success": True}
+
 @app.post("/data_sources/test")
 def test_connection(ds: schemas.DataSourceBase):
     success, msg = metadata_service.test_connection(ds)
     return {"success": success, "message": msg}
 
+@app.get("/data_sources/pool_stats")
+def get_pool_stats():
+    return engine_registry.pool_stats()
+
 # Indicator Endpoints
 @app.post("/indicators/", response_model=schemas.Indicator)
 def create_indicator(indicator: schemas.IndicatorCreate, db: Session = Depends(get_db)):
     return metadata_service.create_indicator(db, indicator)
 
+@app.put("/indicators/{indicator_id}", response_model=schemas.Indicator)
+def update_indicator(indicator_id: int, indicator: schemas.IndicatorCreate, db: Session = Depends(get_db)):
+    db_indicator = metadata_service.update_indicator(db, indicator_id, indicator)
+    if not db_indicator:
+        raise HTTPException(status_code=404, detail="Indicator not found")
+    return db_indicator
+
 @app.get("/indicators/", response_model=list[schemas.Indicator])
 def get_indicators(db: Session = Depends(get_db)):
     return metadata_service.get_indicators(db)
 
+@app.get("/indicators/cache_stats")
+def get_indicator_cache_stats():
+    return {
+        **indicator_value_cache.stats(),
+        "single_flight": indicator_value_flight.stats(),
+        "sql_templates": sql_builder.template_stats(),
+    }
+
+# Rollup Endpoints
+@app.post("/indicators/{indicator_id}/rollups", response_model=schemas.Rollup)
+def create_rollup(indicator_id: int, rollup: schemas.RollupCreate, db: Session = Depends(get_db)):
+    try:
+        return rollups.create_rollup(db, indicator_id, rollup.dimensions)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/indicators/{indicator_id}/rollups", response_model=list[schemas.Rollup])
+def get_rollups(indicator_id: int, db: Session = Depends(get_db)):
+    return rollups.get_rollups(db, indicator_id)
+
+@app.post("/rollups/refresh", response_model=schemas.RollupRefreshReport)
+def refresh_rollups(db: Session = Depends(get_db)):
+    refreshed, errors = rollups.refresh_all(db)
+    return {"refreshed": refreshed, "errors": errors}
+
+@app.post("/rollups/{rollup_id}/refresh", response_model=schemas.Rollup)
+def refresh_rollup(rollup_id: int, full: bool = False, db: Session = Depends(get_db)):
+    try:
+        rollup = rollups.refresh_rollup(db, rollup_id, full=full)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not rollup:
+        raise HTTPException(status_code=404, detail="Rollup not found")
+    return rollup
+
 # Agent Endpoints
 @app.post("/agents/", response_model=schemas.Agent)
 def create_agent(agent: schemas.AgentCreate, db: Session = Depends(get_db)):
     return metadata_service.create_agent(db, agent)
 
+@app.put("/agents/{agent_id}", response_model=schemas.Agent)
+def update_agent(agent_id: int, agent: schemas.AgentCreate, db: Session = Depends(get_db)):
+    db_agent = metadata_service.update_agent(db, agent_id, agent)
+    if not db_agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return db_agent
+
 @app.get("/agents/", response_model=list[schemas.Agent])
 def get_agents(db: Session = Depends(get_db)):
     return metadata_service.get_agents(db)
@@ -48,31 +143,178 @@ def get_agents(db: Session = Depends(get_db)):
 # SOP Endpoints
 @app.post("/sops/", response_model=schemas.SOP)
 def create_sop(sop: schemas.SOPCreate, db: Session = Depends(get_db)):
-    return metadata_service.create_sop(db, sop)
+    try:
+        return metadata_service.create_sop(db, sop)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/sops/", response_model=list[schemas.SOP])
 def get_sops(db: Session = Depends(get_db)):
     return metadata_service.get_sops(db)
 
 # Chat/Query Endpoint
-@app.post("/query/")
-async def query_agent(query: str, agent_id: int):
-    # In a real app, we'd load the agent configuration by agent_id
-    initial_state = {
-        "messages": [HumanMessage(content=query)],
+def _user_message(query: str) -> dict:
+    # Converted to a HumanMessage by the graph's message reducer
+    return {"role": "user", "content": query}
+
+def _initial_state(query: str):
+    return {
+        "messages": [_user_message(query)],
         "indicators": [],
         "sop_id": None,
         "current_task_index": 0,
+        "task_outputs": None,
         "report": ""
     }
-    
-    final_state = await app_graph.ainvoke(initial_state)
+
+async def _graph_call(query: str, agent_id: int, session_id: Optional[str], config: dict):
+    """Graph, input and config for one question. The graph is the agent's, limited to its
+    indicators. With a session id the checkpointed graph resumes the conversation: only the
+    new message is sent, the rest of the state is restored."""
+    if session_id is None:
+        return await run_blocking(graph_registry.get_graph, agent_id), _initial_state(query), config
+    from .agents import sessions
+    graph = await sessions.get_session_graph(agent_id)
+    return graph, {"messages": [_user_message(query)]}, sessions.session_config(agent_id, session_id, **config)
+
+async def _agent_graph_call(query: str, agent_id: int, session_id: Optional[str], config: dict):
+    try:
+        return await _graph_call(query, agent_id, session_id, config)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def _lane(query: str, agent_id: int) -> str:
+    return classify(query, graph_registry.catalog_of(agent_id))
+
+def _with_deadline(config: dict) -> float:
+    # Tools read it to cut their SQL statements off when the run's time is up
+    deadline = deadline_after(QUERY_TIMEOUT)
+    config["configurable"] = {**config.get("configurable", {}), "deadline": deadline}
+    return deadline
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+@app.post("/query/")
+async def query_agent(query: str, agent_id: int, session_id: Optional[str] = None, timings: bool = False):
+    from .agents.instrumentation import MetricsCallbackHandler
+    handler = MetricsCallbackHandler()
+    start = time.perf_counter()
+    graph, state, config = await _agent_graph_call(query, agent_id, session_id, {"callbacks": [handler]})
+    # Quick questions are admitted ahead of SOP runs; both are bounded per agent and in total
+    lane = await run_blocking(_lane, query, agent_id)
+    try:
+        async with admission.slot(agent_id, lane):
+            queued = time.perf_counter() - start
+            _with_deadline(config)
+            final_state = await asyncio.wait_for(graph.ainvoke(state, config=config), QUERY_TIMEOUT)
+    except Overloaded as e:
+        raise _overloaded(e)
+    except asyncio.TimeoutError:
+        metrics.QUERY_TIMEOUTS.inc(scope="graph")
+        raise HTTPException(status_code=504, detail=f"Query did not finish within {QUERY_TIMEOUT:g}s")
+    elapsed = time.perf_counter() - start
+    metrics.GRAPH_SECONDS.observe(elapsed, endpoint="query")
     
     # Return the last message content as the result
-    return {
+    response = {
         "result": final_state["messages"][-1].content,
         "history": [m.content for m in final_state["messages"]]
     }
+    if final_state.get("report"):
+        response["report"] = final_state["report"]
+    if session_id is not None:
+        response["session_id"] = session_id
+    if timings:
+        response["timings"] = {**handler.summary(elapsed), "lane": lane, "queue_seconds": round(queued, 4)}
+    return response
+
+@app.post("/query/stream")
+async def query_agent_stream(query: str, agent_id: int, session_id: Optional[str] = None):
+    """Streams node transitions, tool calls/results and LLM token deltas as Server-Sent Events."""
+    from .agents.instrumentation import MetricsCallbackHandler
+    handler = MetricsCallbackHandler()
+    start = time.perf_counter()
+    # Resolved before streaming starts so an unknown agent is a plain 404 and a full queue a 503
+    graph, state, config = await _agent_graph_call(query, agent_id, session_id, {"callbacks": [handler]})
+    lane = await run_blocking(_lane, query, agent_id)
+    try:
+        admission.check(lane, agent_id)
+    except Overloaded as e:
+        raise _overloaded(e)
+
+    async def event_source():
+        try:
+            from .agents.streaming import stream_agent_events
+            async with admission.slot(agent_id, lane):
+                deadline = _with_deadline(config)
+                async for event in iterate_until(stream_agent_events(graph, state, config=config), deadline):
+                    if event["type"] == "done":
+                        event["timings"] = handler.summary(time.perf_counter() - start)
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+        except asyncio.TimeoutError:
+            metrics.QUERY_TIMEOUTS.inc(scope="graph")
+            message = f"Query did not finish within {QUERY_TIMEOUT:g}s"
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'message': message}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False)}\n\n"
+        finally:
+            metrics.GRAPH_SECONDS.observe(time.perf_counter() - start, endpoint="query_stream")
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/query/admission_stats")
+def get_admission_stats():
+    return admission.stats()
+
+# Session Endpoints
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str, agent_id: int):
+    from .agents import sessions
+    try:
+        state = await sessions.get_session(agent_id, session_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if state is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {
+        "session_id": session_id,
+        "indicators": state.get("indicators", []),
+        "sop_id": state.get("sop_id"),
+        "current_task_index": state.get("current_task_index", 0),
+        "task_outputs": state.get("task_outputs"),
+        "report": state.get("report", ""),
+        "history": [m.content for m in state.get("messages", [])],
+    }
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str, agent_id: int):
+    from .agents import sessions
+    await sessions.delete_session(agent_id, session_id)
+    return {"message": "Session deleted"}
+
+@app.get("/results/{handle}")
+def get_result(handle: str, agent_id: int):
+    """Full data behind a [result:...] handle found in the messages of the agent's runs."""
+    content = result_store.get(handle, agent_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return PlainTextResponse(content)
+
+@app.get("/ready")
+def get_readiness():
+    """200 once the warmup finished, 503 before (or if it failed); the body has the import-time
+    and warmup stage breakdown of this process."""
+    return JSONResponse(warmup.report(), status_code=200 if warmup.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of latency histograms, token counters and cache stats."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, JSON, Table
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, JSON, Table, Float
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -32,6 +32,7 @@ class Indicator(Base):
     evaluation_criteria = Column(Text)
     formula = Column(Text)
     table_name = Column(String(255))
+    cache_ttl = Column(Integer, nullable=True)  # Result cache TTL in seconds for the current period, 0 disables
 
     data_source = relationship("DataSource")
     fields = relationship("IndicatorField", back_populates="indicator", cascade="all, delete-orphan")
@@ -54,6 +55,17 @@ class IndicatorRelation(Base):
     parent_id = Column(Integer, ForeignKey("indicators.id"))
     child_id = Column(Integer, ForeignKey("indicators.id"))
 
+class IndicatorRollup(Base):
+    __tablename__ = "indicator_rollups"
+    id = Column(Integer, primary_key=True, index=True)
+    indicator_id = Column(Integer, ForeignKey("indicators.id"))
+    dimensions = Column(JSON)  # List of DIMENSION field names kept in the rollup
+    table_name = Column(String(255))  # Table in the local rollup store
+    last_period = Column(String(50))  # Latest materialized period, refreshed incrementally from here
+    row_count = Column(Integer)
+    # Set when an indicator edit removed one of the rollup's dimensions; it is not refreshed or read then
+    invalid_reason = Column(String(255), nullable=True)
+
 class Agent(Base):
     __tablename__ = "agents"
     id = Column(Integer, primary_key=True, index=True)
@@ -78,6 +90,16 @@ class SOPTask(Base):
     name = Column(String(255))
     detail = Column(Text)
     tools = Column(JSON)  # List of tool names
-    dependencies = Column(JSON)  # List of parent task IDs or names
+    dependencies = Column(JSON)  # List of parent task names
 
     sop = relationship("SOP", back_populates="tasks")
+
+class CacheEvent(Base):
+    __tablename__ = "cache_events"
+    # Workers follow events by increasing id, so SQLite must never reuse the ids of pruned rows
+    __table_args__ = {"sqlite_autoincrement": True}
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50))  # catalog, data_source, indicator, agent, sop, rollups
+    key = Column(Integer, nullable=True)  # Id of the changed object, if any
+    origin = Column(String(100))  # Worker process that made the change
+    created_at = Column(Float)
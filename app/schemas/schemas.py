@@ -44,6 +44,7 @@ class IndicatorBase(BaseModel):
     evaluation_criteria: Optional[str] = None
     formula: Optional[str] = None
     table_name: Optional[str] = None
+    cache_ttl: Optional[int] = None
     data_source_id: int
 
 class IndicatorCreate(IndicatorBase):
@@ -55,6 +56,25 @@ class Indicator(IndicatorBase):
     class Config:
         orm_mode = True
 
+# Indicator Rollup
+class RollupCreate(BaseModel):
+    dimensions: List[str] = []
+
+class Rollup(RollupCreate):
+    id: int
+    indicator_id: int
+    table_name: Optional[str] = None
+    last_period: Optional[str] = None
+    row_count: Optional[int] = None
+    invalid_reason: Optional[str] = None
+    class Config:
+        orm_mode = True
+
+class RollupRefreshReport(BaseModel):
+    refreshed: List[Rollup]
+    # Rollup id -> why its refresh failed
+    errors: Dict[int, str] = {}
+
 # Agent
 class AgentBase(BaseModel):
     name: str
@@ -0,0 +1,44 @@
+"""Runs the API with several worker processes on one host.
+
+    python -m app.serve --workers 4
+
+Workers share the indicator result cache, the tool result store and the LLM response
+cache through local SQLite files, and follow each other's metadata changes through the
+cache_events table. Explicit settings in the environment (.env) take precedence."""
+import argparse
+import os
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Caches that must be shared once there is more than one process
+SHARED_BACKENDS = {
+    "INDICATOR_CACHE_BACKEND": "sqlite",
+    "RESULT_STORE_BACKEND": "sqlite",
+    "LLM_CACHE_BACKEND": "sqlite",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", str(os.cpu_count() or 1))))
+    args = parser.parse_args()
+
+    # Read by the worker processes when they import the app
+    os.environ["API_WORKERS"] = str(args.workers)
+    if args.workers > 1:
+        for name, value in SHARED_BACKENDS.items():
+            os.environ.setdefault(name, value)
+
+    # Schema is created once here rather than concurrently by every worker
+    from .db import init_db
+    init_db()
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
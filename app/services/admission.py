@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+from dotenv import load_dotenv
+from . import metrics, sop_index
+from .indicator_matcher import match_indicators
+
+load_dotenv()
+
+# Graph runs admitted at once by this process, in total and per agent
+QUERY_MAX_CONCURRENCY = int(os.getenv("QUERY_MAX_CONCURRENCY", "16"))
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "4"))
+# SOP runs never hold more than this many slots, the rest stay free for quick questions
+SOP_MAX_CONCURRENCY = int(os.getenv("SOP_MAX_CONCURRENCY", str(max(1, QUERY_MAX_CONCURRENCY // 2))))
+# Questions waiting for a slot; beyond that new ones are rejected right away
+QUERY_MAX_QUEUE = int(os.getenv("QUERY_MAX_QUEUE", "100"))
+QUERY_QUEUE_TIMEOUT = float(os.getenv("QUERY_QUEUE_TIMEOUT", "30"))
+# Deadline of one admitted graph run; SQL statements of the run are cut off at it too
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "120"))
+
+# Lanes in priority order
+INTERACTIVE, SOP = "interactive", "sop"
+LANES = (INTERACTIVE, SOP)
+
+
+class Overloaded(Exception):
+    """No slot could be granted: the queue is full or the wait timed out."""
+
+
+class Ticket:
+    __slots__ = ("agent_id", "lane", "future", "granted", "enqueued_at")
+
+    def __init__(self, agent_id: int, lane: str, future: Optional[asyncio.Future] = None):
+        self.agent_id = agent_id
+        self.lane = lane
+        self.future = future
+        self.granted = False
+        self.enqueued_at = time.perf_counter()
+
+
+class AdmissionController:
+    """Bounds concurrent graph runs globally, per agent and per lane, and queues the rest.
+
+    Freed slots go to waiting interactive questions before waiting SOP runs; within a lane
+    it is first come, first served, skipping waiters whose agent is at its limit. All
+    methods run on the event loop, so no lock is needed."""
+
+    def __init__(self, max_concurrency: int = QUERY_MAX_CONCURRENCY, agent_max: int = AGENT_MAX_CONCURRENCY,
+                 lane_max: Optional[Dict[str, int]] = None, max_queue: int = QUERY_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.agent_max = agent_max
+        self.lane_max = lane_max if lane_max is not None else {SOP: SOP_MAX_CONCURRENCY}
+        self.max_queue = max_queue
+        self._running = 0
+        self._running_agent: Counter = Counter()
+        self._running_lane: Counter = Counter()
+        self._waiters: Dict[str, Deque[Ticket]] = {lane: deque() for lane in LANES}
+        self.rejected: Counter = Counter()
+
+    def _can_run(self, agent_id: int, lane: str) -> bool:
+        return (
+            self._running < self.max_concurrency
+            and self._running_agent[agent_id] < self.agent_max
+            and self._running_lane[lane] < self.lane_max.get(lane, self.max_concurrency)
+        )
+
+    def _grant(self, ticket: Ticket):
+        ticket.granted = True
+        self._running += 1
+        self._running_agent[ticket.agent_id] += 1
+        self._running_lane[ticket.lane] += 1
+        metrics.QUEUE_WAIT_SECONDS.observe(time.perf_counter() - ticket.enqueued_at, lane=ticket.lane)
+
+    def _dispatch(self):
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            for ticket in list(waiters):
+                if ticket.future.done():
+                    waiters.remove(ticket)
+                elif self._can_run(ticket.agent_id, lane):
+                    waiters.remove(ticket)
+                    self._grant(ticket)
+                    ticket.future.set_result(None)
+
+    def queued(self) -> int:
+        return sum(len(w) for w in self._waiters.values())
+
+    def check(self, lane: str, agent_id: Optional[int] = None):
+        """Raises Overloaded if a new question would be rejected right away: it would have
+        to wait (for agent_id, if given) and the queue is full."""
+        if agent_id is not None and self._can_run(agent_id, lane):
+            return
+        if self.queued() >= self.max_queue:
+            self.rejected[(lane, "queue_full")] += 1
+            metrics.ADMISSION_REJECTED.inc(lane=lane, reason="queue_full")
+            raise Overloaded("Too many questions waiting, retry later.")
+
+    async def acquire(self, agent_id: int, lane: str, timeout: float = QUERY_QUEUE_TIMEOUT) -> Ticket:
+        ticket = Ticket(agent_id, lane, asyncio.get_running_loop().create_future())
+        # Queued in order, then dispatched: waiters ahead only hold it back while they can
+        # run themselves, a waiter blocked by its own agent or lane limit does not
+        self._waiters[lane].append(ticket)
+        self._dispatch()
+        if ticket.granted:
+            return ticket
+        self._waiters[lane].remove(ticket)
+        try:
+            self.check(lane)
+        except Overloaded:
+            ticket.future.cancel()
+            raise
+        self._waiters[lane].append(ticket)
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout)
+        except asyncio.TimeoutError:
+            if not ticket.granted:
+                ticket.future.cancel()
+                self.rejected[(lane, "queue_timeout")] += 1
+                metrics.ADMISSION_REJECTED.inc(lane=lane, reason="queue_timeout")
+                raise Overloaded(f"No capacity within {timeout:g}s, retry later.")
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            if ticket.granted:
+                self.release(ticket)
+            else:
+                ticket.future.cancel()
+            raise
+        return ticket
+
+    def release(self, ticket: Ticket):
+        self._running -= 1
+        self._running_agent[ticket.agent_id] -= 1
+        if not self._running_agent[ticket.agent_id]:
+            del self._running_agent[ticket.agent_id]
+        self._running_lane[ticket.lane] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, agent_id: int, lane: str, timeout: float = QUERY_QUEUE_TIMEOUT):
+        ticket = await self.acquire(agent_id, lane, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "agent_max": self.agent_max,
+            "running_by_lane": {lane: self._running_lane[lane] for lane in LANES},
+            "running_by_agent": dict(self._running_agent),
+            "queued_by_lane": {lane: sum(not t.future.done() for t in self._waiters[lane]) for lane in LANES},
+            "rejected": {f"{lane}:{reason}": n for (lane, reason), n in self.rejected.items()},
+        }
+
+
+def classify(query: str, catalog) -> str:
+    """Predicts the lane of a question the way the graph will route it: an SOP run when the
+    indicators matched in it recall an SOP, an interactive answer otherwise."""
+    indicators, _ = match_indicators(query, catalog)
+    if not indicators:
+        return INTERACTIVE
+    hits = sop_index.search(indicators, query, top_k=1)
+    return SOP if hits and hits[0][1] >= sop_index.MIN_SCORE else INTERACTIVE
+
+
+def deadline_after(seconds: float = QUERY_TIMEOUT) -> float:
+    return time.monotonic() + seconds
+
+
+def deadline_of(config: Optional[dict]) -> Optional[float]:
+    """Deadline of the graph run a tool call belongs to (monotonic clock), if any."""
+    return ((config or {}).get("configurable") or {}).get("deadline")
+
+
+async def iterate_until(iterator: AsyncIterator, deadline: float) -> AsyncIterator:
+    """Yields from an async iterator; raises asyncio.TimeoutError once the deadline passed."""
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(iterator.__anext__(), deadline - time.monotonic())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await iterator.aclose()
+
+
+admission = AdmissionController()
+
+metrics.GaugeCallback(
+    "query_admission", "Admitted and queued graph runs of this process",
+    lambda: {
+        **{(("state", "running"), ("lane", lane)): n for lane, n in admission.stats()["running_by_lane"].items()},
+        **{(("state", "queued"), ("lane", lane)): n for lane, n in admission.stats()["queued_by_lane"].items()},
+    },
+)
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool, QueuePool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool settings for business databases, overridable through the environment (.env)
+POOL_SIZE = int(os.getenv("BIZ_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("BIZ_DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = int(os.getenv("BIZ_DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("BIZ_DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("BIZ_DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Optional cap on connections to one data source from the whole host: with several API
+# worker processes each gets its share (pool size first, then overflow)
+MAX_CONNECTIONS = int(os.getenv("BIZ_DB_MAX_CONNECTIONS", "0"))
+WORKERS = int(os.getenv("API_WORKERS", "1"))
+if MAX_CONNECTIONS > 0:
+    _share = max(1, MAX_CONNECTIONS // max(1, WORKERS))
+    POOL_SIZE = min(POOL_SIZE, _share)
+    MAX_OVERFLOW = min(MAX_OVERFLOW, _share - POOL_SIZE)
+
+# Upper bound on one business database statement in seconds, 0 disables
+SQL_STATEMENT_TIMEOUT = float(os.getenv("SQL_STATEMENT_TIMEOUT", "30"))
+
+_engines: Dict[int, Tuple[str, Engine]] = {}
+_lock = threading.Lock()
+
+
+def build_url(ds) -> str:
+    if ds.db_type == "sqlite":
+        # For sqlite, host is the file path
+        return f"sqlite:///{ds.host}"
+    return f"{ds.db_type}://{ds.username}:{ds.password}@{ds.host}:{ds.port}/{ds.database}"
+
+
+def _create(url: str) -> Engine:
+    if url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_pre_ping=POOL_PRE_PING,
+            connect_args={"check_same_thread": False},
+        )
+    return create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+
+
+def get_engine(ds) -> Engine:
+    """Returns the shared engine of a DataSource, creating it on first use.
+    If the connection settings changed since the engine was built, it is replaced."""
+    url = build_url(ds)
+    with _lock:
+        entry = _engines.get(ds.id)
+        if entry and entry[0] == url:
+            return entry[1]
+        engine = _create(url)
+        _engines[ds.id] = (url, engine)
+    if entry:
+        entry[1].dispose()
+    return engine
+
+
+def evict(ds_id: int):
+    """Disposes the pooled engine of a data source (on edit or delete)."""
+    with _lock:
+        entry = _engines.pop(ds_id, None)
+    if entry:
+        entry[1].dispose()
+
+
+def dispose_all():
+    with _lock:
+        entries = list(_engines.values())
+        _engines.clear()
+    for _, engine in entries:
+        engine.dispose()
+
+
+@contextmanager
+def connect(engine: Engine, deadline: Optional[float] = None):
+    """Connection whose statements are aborted after SQL_STATEMENT_TIMEOUT, or earlier at
+    `deadline` (time.monotonic) when the calling run ends first. Raises TimeoutError.
+
+    PostgreSQL and MySQL enforce the limit server-side (the statement is cancelled there);
+    SQLite is interrupted from its progress handler."""
+    limits = [SQL_STATEMENT_TIMEOUT] if SQL_STATEMENT_TIMEOUT > 0 else []
+    if deadline is not None:
+        limits.append(deadline - time.monotonic())
+    timeout = min(limits) if limits else None
+    if timeout is not None and timeout <= 0:
+        raise TimeoutError("Query deadline exceeded before the statement started.")
+    expires = time.monotonic() + timeout if timeout is not None else None
+    with engine.connect() as conn:
+        dialect = engine.dialect.name
+        reset = None
+        try:
+            if timeout is not None:
+                ms = max(1, int(timeout * 1000))
+                if dialect == "postgresql":
+                    # Transaction-scoped: gone with the rollback when the connection returns to the pool
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {ms}")
+                elif dialect == "mysql":
+                    conn.exec_driver_sql(f"SET SESSION max_execution_time = {ms}")
+                    reset = "SET SESSION max_execution_time = 0"
+                elif dialect == "sqlite":
+                    conn.connection.driver_connection.set_progress_handler(lambda: time.monotonic() > expires, 10000)
+            yield conn
+        except Exception as e:
+            if expires is not None and time.monotonic() >= expires:
+                raise TimeoutError(f"Statement stopped after {timeout:.1f}s.") from e
+            raise
+        finally:
+            # Pooled connections go back without the limit
+            if not conn.invalidated:
+                if reset:
+                    conn.exec_driver_sql(reset)
+                elif dialect == "sqlite" and timeout is not None:
+                    conn.connection.driver_connection.set_progress_handler(None, 0)
+
+
+def check_connection(ds):
+    """Opens one connection to the data source. Unsaved data sources (no id) use a
+    throwaway engine without pooling so nothing is left behind."""
+    ds_id = getattr(ds, "id", None)
+    if ds_id is not None:
+        engine = get_engine(ds)
+        with engine.connect():
+            pass
+        return
+    engine = create_engine(build_url(ds), poolclass=NullPool)
+    try:
+        with engine.connect():
+            pass
+    finally:
+        engine.dispose()
+
+
+def pool_stats() -> Dict[int, dict]:
+    with _lock:
+        entries = dict(_engines)
+    stats = {}
+    for ds_id, (_, engine) in entries.items():
+        pool = engine.pool
+        info = {"pool": type(pool).__name__, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            info.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        stats[ds_id] = info
+    return stats
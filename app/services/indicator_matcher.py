@@ -0,0 +1,131 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .semantic_catalog import Catalog, get_catalog
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over characters, so it works on Chinese text without
+    word segmentation. Matching is case-insensitive. A pattern edge that is an ASCII
+    letter or digit only matches at a word boundary ("GMV" is not found in "GMVX"),
+    while CJK edges match anywhere."""
+
+    def __init__(self, patterns: Dict[str, Set[str]]):
+        # Node arrays: goto transitions, failure links, patterns ending at the node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        self._targets = {}
+        for pattern, targets in patterns.items():
+            key = pattern.lower()
+            if not key:
+                continue
+            self._targets.setdefault(key, set()).update(targets)
+            self._add(key)
+        self._link()
+
+    def _add(self, pattern: str):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if pattern not in self._out[node]:
+            self._out[node].append(pattern)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """Yields (start, end, pattern) for every occurrence."""
+        node = 0
+        text = text.lower()
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern in self._out[node]:
+                start, end = i - len(pattern) + 1, i + 1
+                if _is_word_char(pattern[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(pattern[-1]) and end < len(text) and _is_word_char(text[end]):
+                    continue
+                yield start, end, pattern
+
+    def targets(self, pattern: str) -> Set[str]:
+        return self._targets.get(pattern, set())
+
+
+class IndicatorMatcher:
+    def __init__(self, catalog: Catalog):
+        patterns: Dict[str, Set[str]] = {}
+        for indicator in catalog.indicators.values():
+            for term in [indicator.name] + indicator.synonym_list:
+                patterns.setdefault(term, set()).add(indicator.name)
+        self._automaton = AhoCorasick(patterns)
+
+    def match(self, text: str) -> Tuple[List[str], bool]:
+        """Returns (indicator names in order of appearance, ambiguous).
+        Overlapping hits are resolved leftmost-longest, so "毛利率" does not also yield
+        an indicator named "毛利". A hit is ambiguous when the
+        matched term is a synonym of more than one indicator."""
+        hits = sorted(self._automaton.iter_matches(text), key=lambda h: (h[0], -(h[1] - h[0])))
+        names: List[str] = []
+        ambiguous = False
+        covered_until = 0
+        for start, end, pattern in hits:
+            if start < covered_until:
+                continue
+            covered_until = end
+            targets = self._automaton.targets(pattern)
+            if len(targets) > 1:
+                ambiguous = True
+            for name in sorted(targets):
+                if name not in names:
+                    names.append(name)
+        return names, ambiguous
+
+
+# Matchers of the most recently used catalogs (the snapshot and agent views of it)
+MAX_MATCHERS = 64
+
+_matchers: "OrderedDict[int, Tuple[Catalog, IndicatorMatcher]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_matcher(catalog: Optional[Catalog] = None) -> IndicatorMatcher:
+    """Matcher for a catalog (the current snapshot by default); a new snapshot or view gets a new one."""
+    catalog = catalog or get_catalog()
+    with _lock:
+        entry = _matchers.get(id(catalog))
+        if entry is not None and entry[0] is catalog:
+            _matchers.move_to_end(id(catalog))
+            return entry[1]
+    matcher = IndicatorMatcher(catalog)
+    with _lock:
+        _matchers[id(catalog)] = (catalog, matcher)
+        while len(_matchers) > MAX_MATCHERS:
+            _matchers.popitem(last=False)
+    return matcher
+
+
+def match_indicators(text: str, catalog: Optional[Catalog] = None) -> Tuple[List[str], bool]:
+    return get_matcher(catalog).match(text)
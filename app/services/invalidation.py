@@ -0,0 +1,123 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models import database as models
+from . import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Number of API worker processes on this host (set by app.serve)
+WORKERS = int(os.getenv("API_WORKERS", "1"))
+# Metadata changes are recorded for the other workers; on by default with several workers
+BROADCAST = os.getenv("INVALIDATION_BROADCAST", "true" if WORKERS > 1 else "false").lower() in ("1", "true", "yes")
+POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", "0.5"))
+# Events older than this are pruned; a worker stopped longer than that rebuilds on restart anyway
+RETENTION_SECONDS = int(os.getenv("INVALIDATION_RETENTION", "3600"))
+
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+Handler = Callable[[Session, Optional[int]], None]
+
+_handlers: Dict[str, List[Handler]] = {}
+_last_id = 0
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def subscribe(kind: str, handler: Handler):
+    """Registers the in-memory invalidation for a kind of metadata change. Handlers only
+    drop or rebuild process-local state: they run in the worker that made the change and,
+    through the broadcast, in every other worker."""
+    _handlers.setdefault(kind, []).append(handler)
+
+
+def _apply(db: Session, kind: str, key: Optional[int]):
+    for handler in _handlers.get(kind, ()):
+        try:
+            handler(db, key)
+        except Exception:
+            logger.exception("Invalidation handler for %s %s failed", kind, key)
+
+
+def publish(db: Session, kind: str, key: Optional[int] = None):
+    """Applies a metadata change to this process and, in multi-worker mode, records it for the others."""
+    _apply(db, kind, key)
+    if BROADCAST:
+        db.add(models.CacheEvent(kind=kind, key=key, origin=ORIGIN, created_at=time.time()))
+        db.commit()
+        metrics.INVALIDATIONS.inc(kind=kind, source="published")
+
+
+def poll(db: Session) -> int:
+    """Applies the changes other workers published since the last poll; returns their count."""
+    global _last_id
+    events = db.query(models.CacheEvent).filter(models.CacheEvent.id > _last_id).order_by(models.CacheEvent.id).all()
+    applied = 0
+    for event in events:
+        _last_id = event.id
+        if event.origin == ORIGIN:
+            continue
+        _apply(db, event.kind, event.key)
+        metrics.INVALIDATIONS.inc(kind=event.kind, source="received")
+        applied += 1
+    return applied
+
+
+def _prune(db: Session):
+    # The newest event is always kept: tables created without AUTOINCREMENT would otherwise
+    # hand out its id again and workers would skip every event up to their last seen id
+    newest = db.query(func.max(models.CacheEvent.id)).scalar()
+    db.query(models.CacheEvent).filter(
+        models.CacheEvent.created_at < time.time() - RETENTION_SECONDS, models.CacheEvent.id != newest
+    ).delete()
+    db.commit()
+
+
+def _listen():
+    from ..db import SessionLocal
+    polls = 0
+    while not _stop.wait(POLL_INTERVAL):
+        db = SessionLocal()
+        try:
+            poll(db)
+            polls += 1
+            if polls % 1000 == 0:
+                _prune(db)
+        except Exception:
+            logger.exception("Polling invalidation events failed")
+        finally:
+            db.close()
+
+
+def start():
+    """Starts following the changes of other workers (no-op unless broadcasting).
+    Earlier events are skipped: a starting worker builds its state from the database."""
+    global _thread, _last_id
+    if not BROADCAST or _thread is not None:
+        return
+    from ..db import SessionLocal
+    db = SessionLocal()
+    try:
+        _last_id = db.query(func.max(models.CacheEvent.id)).scalar() or 0
+    finally:
+        db.close()
+    _stop.clear()
+    _thread = threading.Thread(target=_listen, name="invalidation", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=POLL_INTERVAL * 4)
+    _thread = None
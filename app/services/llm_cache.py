@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import RunnableBinding
+from langchain_core.runnables.config import (
+    ensure_config, get_async_callback_manager_for_config, get_callback_manager_for_config,
+)
+from .metrics import LLM_CACHE_REQUESTS
+
+load_dotenv()
+
+# memory | sqlite | none
+BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+
+
+class MemoryBackend:
+    """Bounded in-process LRU."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Local file cache, survives restarts and is shared by processes on the same host."""
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use (callers hold _lock), so importing the module never creates the file
+        if self._connection is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection = conn
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def size(self) -> int:
+        with self._lock:
+            if self._connection is None:
+                return 0
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def _unwrap(model):
+    """The underlying chat model and the call kwargs (tools, temperature ...) bound on top of it."""
+    kwargs = {}
+    while isinstance(model, RunnableBinding):
+        kwargs = {**model.kwargs, **kwargs}
+        model = model.bound
+    return model, kwargs
+
+
+def is_deterministic(model) -> bool:
+    base, kwargs = _unwrap(model)
+    return kwargs.get("temperature", getattr(base, "temperature", None)) == 0
+
+
+def _normalize(message: BaseMessage) -> list:
+    # Tool call ids differ on every run and never change the answer
+    content = message.content
+    if isinstance(content, str):
+        content = " ".join(content.split())
+    calls = [(c["name"], c["args"]) for c in getattr(message, "tool_calls", None) or []]
+    return [message.type, content, calls]
+
+
+def _model_name(base) -> Optional[str]:
+    return getattr(base, "model_name", None) or getattr(base, "model", None)
+
+
+def make_key(model, messages: Sequence[BaseMessage]) -> str:
+    base, kwargs = _unwrap(model)
+    identity = {
+        "model": f"{type(base).__name__}:{_model_name(base)}",
+        "kwargs": kwargs,
+        "messages": [_normalize(m) for m in messages],
+    }
+    raw = json.dumps(identity, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _hit_callbacks(model, messages: Sequence[BaseMessage], cached: BaseMessage, config):
+    """Config (the calling run's callbacks, picked up by ensure_config) and callback
+    arguments reported for a cache hit. The replayed response carries no token usage:
+    a hit costs none."""
+    base, _ = _unwrap(model)
+    config = ensure_config(config)
+    config = {**config, "metadata": {**config.get("metadata", {}), "ls_model_name": _model_name(base),
+                                     "llm_cache": "hit"}}
+    start = ({"name": type(base).__name__}, [list(messages)])
+    replayed = cached.model_copy(update={"usage_metadata": None}) if hasattr(cached, "usage_metadata") else cached
+    return config, start, LLMResult(generations=[[ChatGeneration(message=replayed)]])
+
+
+class LLMCache:
+    """Response cache for calls to models that are already deterministic (temperature 0),
+    keyed on the model, its bound tools and kwargs, and the normalized messages. Other
+    calls pass through. Hits still report chat model start / end to the run's callbacks,
+    so they show up in tracing and latency metrics (tagged llm_cache=hit, without tokens)."""
+
+    def __init__(self, backend=None, ttl: int = TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    def _lookup(self, model, messages, scope: str):
+        if self.backend is None or not is_deterministic(model):
+            LLM_CACHE_REQUESTS.inc(scope=scope, result="bypass")
+            return None, None
+        key = make_key(model, messages)
+        cached = self.backend.get(key)
+        if cached is None:
+            LLM_CACHE_REQUESTS.inc(scope=scope, result="miss")
+            return key, None
+        LLM_CACHE_REQUESTS.inc(scope=scope, result="hit")
+        return key, messages_from_dict([json.loads(cached)])[0]
+
+    def _store(self, key: Optional[str], response: BaseMessage):
+        if key is not None:
+            self.backend.put(key, json.dumps(message_to_dict(response), ensure_ascii=False), self.ttl)
+
+    def invoke(self, model, messages: Sequence[BaseMessage], scope: str = "default", config=None):
+        key, cached = self._lookup(model, messages, scope)
+        if cached is not None:
+            config, start, result = _hit_callbacks(model, messages, cached, config)
+            for run in get_callback_manager_for_config(config).on_chat_model_start(*start):
+                run.on_llm_end(result)
+            return cached
+        response = model.invoke(messages, config)
+        self._store(key, response)
+        return response
+
+    async def ainvoke(self, model, messages: Sequence[BaseMessage], scope: str = "default", config=None):
+        key, cached = self._lookup(model, messages, scope)
+        if cached is not None:
+            config, start, result = _hit_callbacks(model, messages, cached, config)
+            for run in await get_async_callback_manager_for_config(config).on_chat_model_start(*start):
+                await run.on_llm_end(result)
+            return cached
+        response = await model.ainvoke(messages, config)
+        self._store(key, response)
+        return response
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        if self.backend is None:
+            return {"backend": None, "size": 0, "ttl": self.ttl}
+        return {"backend": type(self.backend).__name__, "size": self.backend.size(), "ttl": self.ttl}
+
+
+def _default_backend():
+    if BACKEND == "sqlite":
+        return SQLiteBackend(CACHE_PATH)
+    if BACKEND == "memory":
+        return MemoryBackend(MAX_ENTRIES)
+    return None
+
+
+llm_cache = LLMCache(_default_backend())
@@ -1,20 +1,18 @@
 from sqlalchemy.orm import Session
 from ..models import database as models
 from ..schemas import schemas
-from sqlalchemy import create_engine
-import pandas as pd
+from . import engine_registry
+from . import invalidation
+from .result_cache import indicator_value_cache
+from . import semantic_catalog
+from . import sop_index
+from . import rollups
+from .sop_dag import canonical_dependencies
 
 def test_connection(ds: schemas.DataSourceBase):
-    if ds.db_type == "sqlite":
-        # For sqlite, host is the file path
-        url = f"sqlite:///{ds.host}"
-    else:
-        url = f"{ds.db_type}://{ds.username}:{ds.password}@{ds.host}:{ds.port}/{ds.database}"
-    
     try:
-        engine = create_engine(url)
-        with engine.connect() as conn:
-            return True, "Connection successful"
+        engine_registry.check_connection(ds)
+        return True, "Connection successful"
     except Exception as e:
         return False, str(e)
 
@@ -24,11 +22,32 @@ def create_data_source(db: Session, ds: schemas.DataSourceCreate):
     db.add(db_ds)
     db.commit()
     db.refresh(db_ds)
+    invalidation.publish(db, "catalog")
     return db_ds
 
 def get_data_sources(db: Session):
     return db.query(models.DataSource).all()
 
+def update_data_source(db: Session, ds_id: int, ds: schemas.DataSourceCreate):
+    db_ds = db.query(models.DataSource).filter(models.DataSource.id == ds_id).first()
+    if not db_ds:
+        return None
+    for k, v in ds.dict().items():
+        setattr(db_ds, k, v)
+    db.commit()
+    db.refresh(db_ds)
+    invalidation.publish(db, "data_source", ds_id)
+    return db_ds
+
+def delete_data_source(db: Session, ds_id: int):
+    db_ds = db.query(models.DataSource).filter(models.DataSource.id == ds_id).first()
+    if not db_ds:
+        return False
+    db.delete(db_ds)
+    db.commit()
+    invalidation.publish(db, "data_source", ds_id)
+    return True
+
 # Indicator CRUD
 def create_indicator(db: Session, indicator: schemas.IndicatorCreate):
     db_indicator = models.Indicator(
@@ -38,6 +57,7 @@ def create_indicator(db: Session, indicator: schemas.IndicatorCreate):
         evaluation_criteria=indicator.evaluation_criteria,
         formula=indicator.formula,
         table_name=indicator.table_name,
+        cache_ttl=indicator.cache_ttl,
         data_source_id=indicator.data_source_id
     )
     db.add(db_indicator)
@@ -50,6 +70,20 @@ def create_indicator(db: Session, indicator: schemas.IndicatorCreate):
     
     db.commit()
     db.refresh(db_indicator)
+    invalidation.publish(db, "catalog")
+    return db_indicator
+
+def update_indicator(db: Session, indicator_id: int, indicator: schemas.IndicatorCreate):
+    db_indicator = db.query(models.Indicator).filter(models.Indicator.id == indicator_id).first()
+    if not db_indicator:
+        return None
+    for k, v in indicator.dict(exclude={"fields"}).items():
+        setattr(db_indicator, k, v)
+    db_indicator.fields = [models.IndicatorField(**field.dict()) for field in indicator.fields]
+    db.commit()
+    db.refresh(db_indicator)
+    rollups.invalidate_indicator(db, indicator_id)
+    invalidation.publish(db, "indicator", indicator_id)
     return db_indicator
 
 def get_indicators(db: Session):
@@ -67,6 +101,19 @@ def create_agent(db: Session, agent: schemas.AgentCreate):
     db.add(db_agent)
     db.commit()
     db.refresh(db_agent)
+    invalidation.publish(db, "agent", db_agent.id)
+    return db_agent
+
+def update_agent(db: Session, agent_id: int, agent: schemas.AgentCreate):
+    db_agent = db.query(models.Agent).filter(models.Agent.id == agent_id).first()
+    if not db_agent:
+        return None
+    db_agent.name = agent.name
+    db_agent.description = agent.description
+    db_agent.indicators = db.query(models.Indicator).filter(models.Indicator.id.in_(agent.indicator_ids)).all()
+    db.commit()
+    db.refresh(db_agent)
+    invalidation.publish(db, "agent", agent_id)
     return db_agent
 
 def get_agents(db: Session):
@@ -74,18 +121,44 @@ def get_agents(db: Session):
 
 # SOP CRUD
 def create_sop(db: Session, sop: schemas.SOPCreate):
+    # Rejects unknown dependencies and cycles before anything is stored; names and
+    # positions are resolved once here and stored as task names
+    dependencies = canonical_dependencies(sop.tasks)
     db_sop = models.SOP(name=sop.name, description=sop.description, report_template=sop.report_template)
     db.add(db_sop)
-    db.commit()
-    db.refresh(db_sop)
+    db.flush()
+
+    for task, deps in zip(sop.tasks, dependencies):
+        db.add(models.SOPTask(**{**task.dict(), "dependencies": deps}, sop_id=db_sop.id))
 
-    for task in sop.tasks:
-        db_task = models.SOPTask(**task.dict(), sop_id=db_sop.id)
-        db.add(db_task)
-    
     db.commit()
     db.refresh(db_sop)
+    invalidation.publish(db, "sop", db_sop.id)
     return db_sop
 
 def get_sops(db: Session):
     return db.query(models.SOP).all()
+
+# In-memory state derived from the metadata; see invalidation.publish
+def _on_catalog_changed(db: Session, _=None):
+    semantic_catalog.rebuild(db)
+
+def _on_data_source_changed(db: Session, ds_id: int):
+    engine_registry.evict(ds_id)
+    indicator_value_cache.invalidate_data_source(ds_id)
+    semantic_catalog.rebuild(db)
+
+def _on_indicator_changed(db: Session, indicator_id: int):
+    indicator_value_cache.invalidate_indicator(indicator_id)
+    semantic_catalog.rebuild(db)
+    rollups.reload(db)
+
+def _on_sop_changed(db: Session, sop_id: int):
+    db_sop = db.query(models.SOP).filter(models.SOP.id == sop_id).first()
+    if db_sop:
+        sop_index.index_sop(db_sop)
+
+invalidation.subscribe("catalog", _on_catalog_changed)
+invalidation.subscribe("data_source", _on_data_source_changed)
+invalidation.subscribe("indicator", _on_indicator_changed)
+invalidation.subscribe("sop", _on_sop_changed)
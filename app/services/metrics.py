@@ -0,0 +1,130 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond lookups to long SOP runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _escape(value) -> str:
+    # Label value escaping of the Prometheus text format
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labelnames: Sequence[str], values: Tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(k, "") for k in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}  # key -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(k, "") for k in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if idx < len(self.buckets):
+                series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    labels = _labels(self.labelnames + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class GaugeCallback:
+    """Gauge whose samples are read from a callback at scrape time,
+    e.g. cache sizes and hit rates owned by other modules."""
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]):
+        self.name, self.help, self.collect = name, help, collect
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect().items():
+            if value is None:
+                continue
+            label_str = "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+            lines.append(f"{self.name}{label_str} {value}")
+        return lines
+
+
+REGISTRY: list = []
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Metrics shared across the app
+GRAPH_SECONDS = Histogram("agent_graph_seconds", "End-to-end agent graph run latency", ["endpoint"])
+NODE_SECONDS = Histogram("agent_node_seconds", "Graph node latency", ["node"])
+TOOL_SECONDS = Histogram("agent_tool_seconds", "Tool execution latency", ["tool"])
+LLM_SECONDS = Histogram("agent_llm_seconds", "LLM call latency", ["model"])
+LLM_TOKENS = Counter("agent_llm_tokens_total", "LLM tokens used", ["model", "kind"])
+SQL_SECONDS = Histogram("indicator_sql_seconds", "Business database statement latency", ["operation"])
+SQL_ROWS = Histogram("indicator_sql_rows", "Rows returned per business database statement", ["operation"], COUNT_BUCKETS)
+CATALOG_REBUILD_SECONDS = Histogram("semantic_catalog_rebuild_seconds", "Semantic catalog snapshot build latency")
+LLM_CACHE_REQUESTS = Counter("agent_llm_cache_requests_total", "LLM response cache lookups", ["scope", "result"])
+PROMPT_TOKENS = Histogram("agent_prompt_tokens", "Estimated prompt tokens per LLM call, before (raw) and after (sent) trimming", ["scope", "stage"], COUNT_BUCKETS)
+CONTEXT_TRIMMED = Counter("agent_context_trimmed_total", "Messages elided or dropped to fit the token budget", ["scope", "action"])
+INVALIDATIONS = Counter("metadata_invalidations_total", "Metadata change events published by this worker or received from others", ["kind", "source"])
+QUEUE_WAIT_SECONDS = Histogram("query_queue_wait_seconds", "Time a question waited for an admission slot", ["lane"])
+ADMISSION_REJECTED = Counter("query_admission_rejected_total", "Questions rejected by admission control", ["lane", "reason"])
+QUERY_TIMEOUTS = Counter("query_timeouts_total", "Graph runs or SQL statements stopped at their deadline", ["scope"])
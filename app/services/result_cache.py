@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Optional
+from dotenv import load_dotenv
+from . import metrics
+from .shared_store import SharedStore
+
+load_dotenv()
+
+# Result cache settings, overridable through the environment (.env)
+# memory (per process) | sqlite (shared by the worker processes of the host)
+BACKEND = os.getenv("INDICATOR_CACHE_BACKEND", "memory").lower()
+MAX_ENTRIES = int(os.getenv("INDICATOR_CACHE_MAX_ENTRIES", "2048"))
+DEFAULT_TTL = int(os.getenv("INDICATOR_CACHE_TTL", "300"))
+CLOSED_PERIOD_TTL = int(os.getenv("INDICATOR_CACHE_CLOSED_TTL", "86400"))
+
+
+def normalize_filters(dimension_filters: Optional[dict]) -> tuple:
+    if not dimension_filters:
+        return ()
+    items = []
+    for k, v in dimension_filters.items():
+        # A scalar filters the same rows as a one-element list, so both get the same key
+        values = v if isinstance(v, (list, tuple, set)) else [v]
+        items.append((str(k), tuple(sorted({str(x) for x in values}))))
+    return tuple(sorted(items))
+
+
+def make_key(indicator_name: str, time_value: str, dimension_filters: Optional[dict] = None) -> tuple:
+    return (indicator_name, str(time_value), normalize_filters(dimension_filters))
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a per-entry TTL.
+    Entries are tagged with the indicator and data source they were computed from
+    so metadata changes can drop exactly the affected results."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _, _ = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl: int, indicator_id: int = None, data_source_id: int = None):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl, indicator_id, data_source_id)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _drop(self, predicate) -> int:
+        with self._lock:
+            keys = [k for k, entry in self._data.items() if predicate(entry)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def invalidate_indicator(self, indicator_id: int) -> int:
+        return self._drop(lambda entry: entry[2] == indicator_id)
+
+    def invalidate_data_source(self, data_source_id: int) -> int:
+        return self._drop(lambda entry: entry[3] == data_source_id)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else None,
+            }
+
+
+class SharedTTLCache:
+    """TTLCache interface over the host-wide shared store, so every worker process
+    answers from results computed by any of them. Hit/miss counters are per process."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._store = SharedStore("indicator_results", max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(key) -> str:
+        return json.dumps(key, ensure_ascii=False)
+
+    def get(self, key):
+        value = self._store.get(self._key(key))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value, ttl: int, indicator_id: int = None, data_source_id: int = None):
+        if ttl <= 0:
+            return
+        self._store.put(self._key(key), value, ttl, indicator_id, data_source_id)
+
+    def invalidate_indicator(self, indicator_id: int) -> int:
+        return self._store.delete(indicator_id=indicator_id)
+
+    def invalidate_data_source(self, data_source_id: int) -> int:
+        return self._store.delete(data_source_id=data_source_id)
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "size": self._store.size(),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "evictions": self._store.evictions,
+            "hit_rate": hits / total if total else None,
+        }
+
+
+def ttl_for(indicator, codec, time_value: str) -> int:
+    """Current (still open) periods use the indicator's TTL; closed historical periods
+    cannot change any more and are kept much longer. A TTL of 0 disables caching."""
+    ttl = indicator.cache_ttl if indicator.cache_ttl is not None else DEFAULT_TTL
+    try:
+        closed = codec.parse(time_value) < codec.parse(codec.format(date.today()))
+    except ValueError:
+        closed = False
+    return max(ttl, CLOSED_PERIOD_TTL) if closed and ttl > 0 else ttl
+
+
+indicator_value_cache = SharedTTLCache() if BACKEND == "sqlite" else TTLCache()
+
+metrics.GaugeCallback(
+    "indicator_cache", "Indicator value cache statistics",
+    lambda: {(("stat", k),): v for k, v in indicator_value_cache.stats().items()},
+)
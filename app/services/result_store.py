@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+from . import metrics
+from .shared_store import SharedStore
+
+load_dotenv()
+
+# Tool results kept server-side and referenced from the conversation by handle
+# sqlite (shared by the worker processes of the host, survives restarts) | memory (per process).
+# Session checkpoints keep handles across turns, restarts and workers, so the shared store is
+# the default; memory only suits deployments without sessions.
+BACKEND = os.getenv("RESULT_STORE_BACKEND", "sqlite").lower()
+MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "1024"))
+MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Lifetime of a result in the shared store (the memory store only evicts by size)
+TTL = int(os.getenv("RESULT_STORE_TTL", "86400"))
+# Results up to this size stay inline in the ToolMessage
+INLINE_MAX_CHARS = int(os.getenv("RESULT_INLINE_MAX_CHARS", "800"))
+# Characters of a stored result returned by one fetch_result call
+FETCH_PAGE_CHARS = int(os.getenv("RESULT_FETCH_PAGE_CHARS", "4000"))
+SUMMARY_LIST_ITEMS = 5
+
+# Name of the tool that dereferences a handle; its output is never replaced by a handle
+FETCH_TOOL_NAME = "fetch_result"
+
+HANDLE_PATTERN = re.compile(r"\[result:(res_[0-9a-f]{12})\]")
+
+
+def content_handle(content: str, owner: Optional[int] = None) -> str:
+    return "res_" + hashlib.sha1(f"{owner}\0{content}".encode("utf-8")).hexdigest()[:12]
+
+
+def owner_of(config: Optional[dict]) -> Optional[int]:
+    """Agent a result belongs to: the one whose graph run (config) produced or reads it."""
+    return ((config or {}).get("configurable") or {}).get("agent_id")
+
+
+class ResultStore:
+    """Bounded LRU of full tool results, addressed by a hash of the owning agent and
+    the content: identical results of one agent share one entry and one handle, and a
+    handle only resolves for the agent that owns it."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, content: str, owner: Optional[int] = None) -> str:
+        handle = content_handle(content, owner)
+        with self._lock:
+            if handle in self._data:
+                self._data.move_to_end(handle)
+                return handle
+            self._data[handle] = (owner, content)
+            self._bytes += len(content.encode("utf-8"))
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= len(evicted.encode("utf-8"))
+                self.evictions += 1
+        return handle
+
+    def get(self, handle: str, owner: Optional[int] = None) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(handle)
+            if entry is None or entry[0] != owner:
+                return None
+            self._data.move_to_end(handle)
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "bytes": self._bytes, "max_entries": self.max_entries,
+                    "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class SharedResultStore:
+    """ResultStore interface over the host-wide shared store, so a handle written by one
+    worker process resolves in any other (later turns of a session may land elsewhere).
+    Bounded by entry count and TTL only."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: int = TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._store = SharedStore("tool_results", max_entries)
+
+    def put(self, content: str, owner: Optional[int] = None) -> str:
+        handle = content_handle(content, owner)
+        self._store.put(handle, json.dumps({"owner": owner, "content": content}, ensure_ascii=False), self.ttl)
+        return handle
+
+    def get(self, handle: str, owner: Optional[int] = None) -> Optional[str]:
+        value = self._store.get(handle)
+        if value is None:
+            return None
+        try:
+            entry = json.loads(value)
+        except ValueError:  # Written before results had owners
+            return None
+        return entry["content"] if isinstance(entry, dict) and entry.get("owner") == owner else None
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self) -> dict:
+        return {"size": self._store.size(), "max_entries": self.max_entries, "ttl": self.ttl,
+                "evictions": self._store.evictions}
+
+
+def _shrink(value):
+    """Keeps the shape of a JSON result but only the first items of long lists."""
+    if isinstance(value, dict):
+        return {k: _shrink(v) for k, v in value.items()}
+    if isinstance(value, list):
+        head = [_shrink(v) for v in value[:SUMMARY_LIST_ITEMS]]
+        if len(value) > SUMMARY_LIST_ITEMS:
+            head.append(f"... {len(value) - SUMMARY_LIST_ITEMS} more")
+        return head
+    return value
+
+
+def summarize(content: str, max_chars: int = INLINE_MAX_CHARS) -> str:
+    try:
+        summary = json.dumps(_shrink(json.loads(content)), ensure_ascii=False, default=str)
+    except ValueError:
+        summary = content
+    return summary if len(summary) <= max_chars else summary[:max_chars] + " ..."
+
+
+def compact(content: str, owner: Optional[int] = None) -> str:
+    """Short results are returned as is; long ones are stored for owner and replaced by a handle plus a summary."""
+    if not isinstance(content, str) or len(content) <= INLINE_MAX_CHARS:
+        return content
+    handle = result_store.put(content, owner)
+    return f"[result:{handle}] {summarize(content)}\n(Truncated; call {FETCH_TOOL_NAME} with handle '{handle}' for the full data.)"
+
+
+def compact_message(message, owner: Optional[int] = None):
+    """Same message with its content compacted (ToolMessage or any message with str content)."""
+    if getattr(message, "name", None) == FETCH_TOOL_NAME:
+        return message
+    content = compact(message.content, owner)
+    if content is message.content:
+        return message
+    return message.model_copy(update={"content": content})
+
+
+def handles_in(text: str) -> list:
+    return list(dict.fromkeys(HANDLE_PATTERN.findall(text or "")))
+
+
+def page(content: str, handle: str, offset: int = 0, size: Optional[int] = None) -> str:
+    """One window of a stored result, with a note on how to read the next one."""
+    offset = max(0, offset)
+    end = min(len(content), offset + (size or FETCH_PAGE_CHARS))
+    text = content[offset:end]
+    if offset == 0 and end == len(content):
+        return text
+    note = f"(Characters {offset}-{end} of {len(content)}"
+    if end < len(content):
+        note += f"; call {FETCH_TOOL_NAME} with handle '{handle}' and offset {end} for more"
+    return f"{text}\n{note}.)"
+
+
+def expand(text: str, owner: Optional[int] = None) -> str:
+    """Appends the full data of every handle of owner referenced in text, for the final report."""
+    sections = []
+    for handle in handles_in(text):
+        content = result_store.get(handle, owner)
+        if content is not None:
+            sections.append(f"[result:{handle}]\n```\n{content}\n```")
+    return text + ("\n\n## Data\n" + "\n\n".join(sections) if sections else "")
+
+
+result_store = SharedResultStore() if BACKEND == "sqlite" else ResultStore()
+
+metrics.GaugeCallback(
+    "result_store", "Server-side tool result store statistics",
+    lambda: {(("stat", k),): v for k, v in result_store.stats().items()},
+)
@@ -0,0 +1,227 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models import database as models
+from . import engine_registry, invalidation, metrics, sql_builder
+from .result_cache import indicator_value_cache
+from .semantic_catalog import get_catalog
+from .time_periods import PeriodCodec, codec_for
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Local store holding pre-aggregated indicator tables
+ROLLUP_DATABASE_URL = os.getenv("ROLLUP_DATABASE_URL", "sqlite:///./rollups.db")
+
+_store_engine = None
+_store_lock = threading.Lock()
+
+
+def store_engine():
+    global _store_engine
+    if _store_engine is None:
+        with _store_lock:
+            if _store_engine is None:
+                kwargs = {"connect_args": {"check_same_thread": False}} if ROLLUP_DATABASE_URL.startswith("sqlite") else {}
+                _store_engine = create_engine(ROLLUP_DATABASE_URL, pool_pre_ping=True, **kwargs)
+    return _store_engine
+
+
+@dataclass(frozen=True)
+class RollupInfo:
+    id: int
+    indicator_id: int
+    table_name: str
+    dimensions: Tuple[str, ...]
+    last_period: Optional[str]
+    row_count: int
+
+
+@dataclass(frozen=True)
+class QueryTarget:
+    """Where an indicator aggregate is read from: the raw fact table or a rollup."""
+    engine: object
+    table: str
+    time_col: str
+    measure_col: str
+    rollup_id: Optional[int] = None
+
+
+# indicator_id -> rollups, swapped as a whole on every change
+_rollups: Dict[int, Tuple[RollupInfo, ...]] = {}
+_loaded = False
+
+
+def reload(db: Session):
+    global _rollups, _loaded
+    rollups: Dict[int, List[RollupInfo]] = {}
+    for r in db.query(models.IndicatorRollup).all():
+        rollups.setdefault(r.indicator_id, []).append(RollupInfo(
+            r.id, r.indicator_id, r.table_name, tuple(r.dimensions or []), r.last_period, r.row_count or 0
+        ))
+    _rollups = {k: tuple(v) for k, v in rollups.items()}
+    _loaded = True
+
+
+def _ensure_loaded():
+    if not _loaded:
+        from ..db import SessionLocal
+        db = SessionLocal()
+        try:
+            reload(db)
+        finally:
+            db.close()
+
+
+def _parse(codec: PeriodCodec, value: Optional[str]) -> Optional[date]:
+    try:
+        return codec.parse(value) if value else None
+    except ValueError:
+        return None
+
+
+def route(indicator, dimensions: Iterable[str], periods: Iterable[str]) -> QueryTarget:
+    """Picks the smallest materialized rollup that keeps every requested dimension and
+    covers every requested period; falls back to the raw table otherwise.
+
+    The last materialized period may still be open (rows keep arriving until the next
+    refresh), so a rollup only serves periods strictly before it."""
+    _ensure_loaded()
+    try:
+        codec = codec_for(indicator.time_field)
+        keys = [_parse(codec, p) for p in periods if p]
+    except ValueError:
+        keys = [None]
+    dimensions = set(dimensions)
+    candidates = []
+    if None not in keys:
+        for r in _rollups.get(indicator.id, ()):
+            last = _parse(codec, r.last_period)
+            if last and dimensions <= set(r.dimensions) and all(k < last for k in keys):
+                candidates.append(r)
+    if candidates:
+        best = min(candidates, key=lambda r: r.row_count)
+        return QueryTarget(store_engine(), best.table_name, "period", "value", best.id)
+    return QueryTarget(
+        engine_registry.get_engine(indicator.data_source), indicator.table_name,
+        indicator.time_field.name, indicator.measure_field.name,
+    )
+
+
+def create_rollup(db: Session, indicator_id: int, dimensions: List[str]) -> models.IndicatorRollup:
+    indicator = get_catalog().by_id.get(indicator_id)
+    if indicator is None:
+        raise LookupError(f"Indicator {indicator_id} not found.")
+    if not indicator.time_field or not indicator.measure_field:
+        raise ValueError("Indicator definition missing TIME or MEASURE fields.")
+    allowed = {f.name for f in indicator.dimension_fields}
+    unknown = [d for d in dimensions if d not in allowed]
+    if unknown:
+        raise ValueError(f"Not DIMENSION fields of '{indicator.name}': {unknown}.")
+
+    rollup = models.IndicatorRollup(indicator_id=indicator_id, dimensions=list(dict.fromkeys(dimensions)))
+    db.add(rollup)
+    db.commit()
+    rollup.table_name = f"rollup_{indicator_id}_{rollup.id}"
+    db.commit()
+    return refresh_rollup(db, rollup.id, full=True)
+
+
+def refresh_rollup(db: Session, rollup_id: int, full: bool = False) -> Optional[models.IndicatorRollup]:
+    """Materializes the rollup. Incremental refreshes re-aggregate only from the last
+    materialized period on (it may have been open), so history is never rescanned."""
+    rollup = db.query(models.IndicatorRollup).filter(models.IndicatorRollup.id == rollup_id).first()
+    if rollup is None:
+        return None
+    if rollup.invalid_reason:
+        raise ValueError(f"Rollup {rollup_id} is invalid: {rollup.invalid_reason}")
+    indicator = get_catalog().by_id[rollup.indicator_id]
+    codec = codec_for(indicator.time_field)
+    dims = list(rollup.dimensions or [])
+    # "Since" is a string comparison in SQL, only chronological for sortable formats
+    since = None if full or not codec.sortable else rollup.last_period
+
+    source = QueryTarget(
+        engine_registry.get_engine(indicator.data_source), indicator.table_name,
+        indicator.time_field.name, indicator.measure_field.name,
+    )
+    query, params = sql_builder.aggregate(
+        indicator, source, [(source.measure_col, "value")], dimensions=[(d, d) for d in dims], since=since or None
+    )
+    import pandas as pd
+    # Bounded by the statement timeout like every other read of the data source
+    with metrics.SQL_SECONDS.time(operation="rollup_refresh"), engine_registry.connect(source.engine) as conn:
+        df = pd.read_sql(query, conn, params=params)
+    df["period"] = df["period"].astype(str)
+
+    with store_engine().begin() as conn:
+        if since:
+            conn.execute(text(f"DELETE FROM {rollup.table_name} WHERE period >= :since"), {"since": since})
+        else:
+            conn.execute(text(f"DROP TABLE IF EXISTS {rollup.table_name}"))
+        df.to_sql(rollup.table_name, conn, if_exists="append", index=False)
+        index_cols = ", ".join(["period"] + dims)
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{rollup.table_name} ON {rollup.table_name} ({index_cols})"))
+        row_count = conn.execute(text(f"SELECT COUNT(*) FROM {rollup.table_name}")).scalar()
+
+    if not df.empty:
+        periods = [p for p in [*df["period"].unique(), since] if _parse(codec, p)]
+        rollup.last_period = max(periods, key=codec.parse) if periods else None
+    rollup.row_count = row_count
+    db.commit()
+    db.refresh(rollup)
+    invalidation.publish(db, "rollup", rollup.indicator_id)
+    return rollup
+
+
+def invalidate_indicator(db: Session, indicator_id: int):
+    """Marks the indicator's rollups as unmaterialized after its definition changed,
+    so queries go to the raw table until the next full refresh. Rollups keeping a
+    dimension the indicator no longer has are marked invalid and are not refreshed
+    until the dimension is back."""
+    dimensions = {
+        f.name for f in db.query(models.IndicatorField).filter(
+            models.IndicatorField.indicator_id == indicator_id, models.IndicatorField.field_role == "DIMENSION"
+        )
+    }
+    for rollup in db.query(models.IndicatorRollup).filter(models.IndicatorRollup.indicator_id == indicator_id):
+        removed = [d for d in rollup.dimensions or [] if d not in dimensions]
+        rollup.last_period = None
+        rollup.invalid_reason = f"Not DIMENSION fields of the indicator anymore: {removed}." if removed else None
+    db.commit()
+    reload(db)
+
+
+def _on_rollup_changed(db: Session, indicator_id: int):
+    reload(db)
+    indicator_value_cache.invalidate_indicator(indicator_id)
+
+
+invalidation.subscribe("rollup", _on_rollup_changed)
+
+
+def refresh_all(db: Session) -> Tuple[List[models.IndicatorRollup], Dict[int, str]]:
+    """Refreshes every valid rollup on its own, so one failing (its source is down, a
+    statement timed out) does not stop the others. Returns the refreshed rollups and
+    the error of each failed one by id."""
+    refreshed, errors = [], {}
+    rollup_ids = [r.id for r in db.query(models.IndicatorRollup).filter(models.IndicatorRollup.invalid_reason.is_(None))]
+    for rollup_id in rollup_ids:
+        try:
+            refreshed.append(refresh_rollup(db, rollup_id))
+        except Exception as e:
+            db.rollback()
+            logger.exception("Refreshing rollup %s failed", rollup_id)
+            errors[rollup_id] = str(e)
+    return refreshed, errors
+
+
+def get_rollups(db: Session, indicator_id: int):
+    return db.query(models.IndicatorRollup).filter(models.IndicatorRollup.indicator_id == indicator_id).all()
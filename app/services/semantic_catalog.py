@@ -0,0 +1,200 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy.orm import Session, selectinload
+from ..models import database as models
+from .metrics import CATALOG_REBUILD_SECONDS
+
+
+@dataclass(frozen=True)
+class DataSourceInfo:
+    id: int
+    name: str
+    db_type: str
+    host: Optional[str]
+    port: Optional[int]
+    database: Optional[str]
+    username: Optional[str]
+    password: Optional[str]
+
+
+@dataclass(frozen=True)
+class FieldInfo:
+    name: str
+    data_type: Optional[str]
+    description: Optional[str]
+    field_role: Optional[str]
+    time_format: Optional[str]
+
+
+@dataclass(frozen=True)
+class IndicatorInfo:
+    id: int
+    name: str
+    synonyms: Optional[str]
+    unit: Optional[str]
+    evaluation_criteria: Optional[str]
+    formula: Optional[str]
+    table_name: Optional[str]
+    cache_ttl: Optional[int]
+    data_source_id: Optional[int]
+    data_source: Optional[DataSourceInfo]
+    fields: Tuple[FieldInfo, ...]
+    time_field: Optional[FieldInfo]
+    measure_field: Optional[FieldInfo]
+    dimension_fields: Tuple[FieldInfo, ...]
+
+    @property
+    def synonym_list(self) -> List[str]:
+        return split_synonyms(self.synonyms)
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """Immutable snapshot of the semantic layer. Never mutated after construction;
+    writers build a new one and swap the module-level reference."""
+    indicators: Dict[str, IndicatorInfo] = field(default_factory=dict)
+    by_id: Dict[int, IndicatorInfo] = field(default_factory=dict)
+    by_synonym: Dict[str, IndicatorInfo] = field(default_factory=dict)
+    children: Dict[int, Tuple[int, ...]] = field(default_factory=dict)
+    parents: Dict[int, Tuple[int, ...]] = field(default_factory=dict)
+    data_sources: Dict[int, DataSourceInfo] = field(default_factory=dict)
+    # True for a view restricted to one agent's indicators
+    scoped: bool = False
+
+    def find(self, name: str) -> Optional[IndicatorInfo]:
+        """Resolves an indicator by exact name, then by synonym."""
+        name = name.strip()
+        return self.indicators.get(name) or self.by_synonym.get(name)
+
+    def children_of(self, indicator: IndicatorInfo) -> List[str]:
+        return [self.by_id[i].name for i in self.children.get(indicator.id, ()) if i in self.by_id]
+
+    def parents_of(self, indicator: IndicatorInfo) -> List[str]:
+        return [self.by_id[i].name for i in self.parents.get(indicator.id, ()) if i in self.by_id]
+
+    def restrict(self, indicator_ids) -> "Catalog":
+        """View limited to the given indicators; relations leaving the view are dropped."""
+        ids = set(indicator_ids)
+        by_id = {i: info for i, info in self.by_id.items() if i in ids}
+        return Catalog(
+            indicators={info.name: info for info in by_id.values()},
+            by_id=by_id,
+            by_synonym={s: info for s, info in self.by_synonym.items() if info.id in ids},
+            children={k: tuple(c for c in v if c in ids) for k, v in self.children.items() if k in ids},
+            parents={k: tuple(p for p in v if p in ids) for k, v in self.parents.items() if k in ids},
+            data_sources=self.data_sources,
+            scoped=True,
+        )
+
+
+def split_synonyms(synonyms: Optional[str]) -> List[str]:
+    if not synonyms:
+        return []
+    return [s.strip() for s in synonyms.replace("，", ",").split(",") if s.strip()]
+
+
+def _field_info(f) -> FieldInfo:
+    return FieldInfo(f.name, f.data_type, f.description, f.field_role, f.time_format)
+
+
+def build(db: Session) -> Catalog:
+    data_sources = {
+        ds.id: DataSourceInfo(ds.id, ds.name, ds.db_type, ds.host, ds.port, ds.database, ds.username, ds.password)
+        for ds in db.query(models.DataSource).all()
+    }
+
+    indicators, by_id, by_synonym = {}, {}, {}
+    for ind in db.query(models.Indicator).options(selectinload(models.Indicator.fields)).all():
+        fields = tuple(_field_info(f) for f in ind.fields)
+        info = IndicatorInfo(
+            id=ind.id,
+            name=ind.name,
+            synonyms=ind.synonyms,
+            unit=ind.unit,
+            evaluation_criteria=ind.evaluation_criteria,
+            formula=ind.formula,
+            table_name=ind.table_name,
+            cache_ttl=ind.cache_ttl,
+            data_source_id=ind.data_source_id,
+            data_source=data_sources.get(ind.data_source_id),
+            fields=fields,
+            time_field=next((f for f in fields if f.field_role == "TIME"), None),
+            measure_field=next((f for f in fields if f.field_role == "MEASURE"), None),
+            dimension_fields=tuple(f for f in fields if f.field_role == "DIMENSION"),
+        )
+        indicators[info.name] = info
+        by_id[info.id] = info
+        for synonym in info.synonym_list:
+            by_synonym.setdefault(synonym, info)
+
+    children, parents = {}, {}
+    for rel in db.query(models.IndicatorRelation).all():
+        children.setdefault(rel.parent_id, []).append(rel.child_id)
+        parents.setdefault(rel.child_id, []).append(rel.parent_id)
+
+    return Catalog(
+        indicators=indicators,
+        by_id=by_id,
+        by_synonym=by_synonym,
+        children={k: tuple(v) for k, v in children.items()},
+        parents={k: tuple(v) for k, v in parents.items()},
+        data_sources=data_sources,
+    )
+
+
+_catalog: Optional[Catalog] = None
+_build_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """Lock-free read of the current snapshot (built on first use)."""
+    catalog = _catalog
+    if catalog is None:
+        from ..db import SessionLocal
+        db = SessionLocal()
+        try:
+            catalog = rebuild(db)
+        finally:
+            db.close()
+    return catalog
+
+
+def rebuild(db: Session) -> Catalog:
+    """Rebuilds the snapshot from the metadata database and swaps it in atomically."""
+    global _catalog
+    with _build_lock, CATALOG_REBUILD_SECONDS.time():
+        catalog = build(db)
+        _catalog = catalog
+    return catalog
+
+
+class _Views:
+    def __init__(self, base: Catalog):
+        self.base = base
+        self.views: Dict[FrozenSet[int], Catalog] = {}
+
+
+_views: Optional[_Views] = None
+
+
+def scoped_catalog(indicator_ids: Optional[FrozenSet[int]] = None) -> Catalog:
+    """View of the current snapshot limited to an agent's indicators (everything when None
+    or empty). Views are built once per snapshot and dropped with it."""
+    global _views
+    catalog = get_catalog()
+    if not indicator_ids:
+        return catalog
+    views = _views
+    if views is None or views.base is not catalog:
+        views = _views = _Views(catalog)
+    view = views.views.get(indicator_ids)
+    if view is None:
+        view = views.views[indicator_ids] = catalog.restrict(indicator_ids)
+    return view
+
+
+def catalog_for(config: Optional[dict]) -> Catalog:
+    """Catalog view for a runnable config carrying the calling agent's `indicator_ids`."""
+    configurable = (config or {}).get("configurable") or {}
+    return scoped_catalog(configurable.get("indicator_ids"))
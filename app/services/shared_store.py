@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Local SQLite file holding the caches shared by the API worker processes of one host
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "./shared_cache.db")
+
+# Expired and surplus rows are purged once every this many writes
+TRIM_EVERY = 64
+
+
+class SharedStore:
+    """Key/value table in a local SQLite file (WAL), readable and writable by every worker
+    process on the host. Rows carry an absolute expiry and optional indicator / data source
+    tags for targeted invalidation. Bounded by entry count, oldest writes go first."""
+
+    def __init__(self, table: str, max_entries: int, path: str = SHARED_CACHE_PATH):
+        self.table = table
+        self.max_entries = max_entries
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use (callers hold _lock), so importing a module never creates the file
+        if self._connection is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, indicator_id INTEGER, data_source_id INTEGER)"
+            )
+            self._connection = conn
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str, ttl: float, indicator_id: int = None, data_source_id: int = None):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, indicator_id, data_source_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, time.time() + ttl, indicator_id, data_source_id),
+            )
+            self._writes += 1
+            if self._writes % TRIM_EVERY == 0:
+                self.evictions += self._trim_locked()
+
+    def _trim_locked(self) -> int:
+        deleted = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (time.time(),)).rowcount
+        # REPLACE assigns a new rowid, so rowid order is write order
+        deleted += self._conn.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN (SELECT rowid FROM {self.table} ORDER BY rowid DESC "
+            "LIMIT -1 OFFSET ?)", (self.max_entries,)
+        ).rowcount
+        return deleted
+
+    def delete(self, indicator_id: int = None, data_source_id: int = None) -> int:
+        column, value = ("indicator_id", indicator_id) if indicator_id is not None else ("data_source_id", data_source_id)
+        with self._lock:
+            return self._conn.execute(f"DELETE FROM {self.table} WHERE {column} = ?", (value,)).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def size(self) -> int:
+        with self._lock:
+            if self._connection is None:
+                return 0
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
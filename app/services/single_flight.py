@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+from . import metrics
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing a key: the first caller executes, the others
+    wait for it and receive the same result (or exception).
+
+    `do` serves threads (sync tools, thread pool workers); `ado` serves coroutines and
+    joins the same in-flight execution as `do`, so sync and async callers are coalesced
+    together while async waiters do not hold a thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, Future] = {}
+        self._async_calls: Dict[Any, asyncio.Future] = {}
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, fn: Callable[[], Any]):
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+                self.executions += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key, fn: Callable[[], Any], executor=None):
+        """Async variant: fn is a blocking callable run on `executor` (default pool if None)."""
+        loop = asyncio.get_running_loop()
+        async_key = (loop, key)
+        with self._lock:
+            fut = self._async_calls.get(async_key)
+            leader = fut is None
+            if leader:
+                fut = loop.create_future()
+                self._async_calls[async_key] = fut
+            else:
+                self.shared += 1
+        if leader:
+            # The execution belongs to the key, not to the leader: if the leader is
+            # cancelled (e.g. its client disconnected) the work still completes for
+            # the followers awaiting the shared future
+            work = loop.run_in_executor(executor, self.do, key, fn)
+            work.add_done_callback(lambda w: self._settle(async_key, fut, w))
+        return await asyncio.shield(fut)
+
+    def _settle(self, async_key, fut: asyncio.Future, work: asyncio.Future):
+        with self._lock:
+            self._async_calls.pop(async_key, None)
+        if fut.done():
+            return
+        if work.cancelled():
+            fut.cancel()
+        elif work.exception() is not None:
+            fut.set_exception(work.exception())
+            fut.exception()  # Mark retrieved when nobody else was waiting
+        else:
+            fut.set_result(work.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "shared": self.shared,
+            }
+
+
+indicator_value_flight = SingleFlight()
+
+metrics.GaugeCallback(
+    "indicator_single_flight", "Coalesced indicator value queries",
+    lambda: {(("stat", k),): v for k, v in indicator_value_flight.stats().items()},
+)
@@ -0,0 +1,54 @@
+from typing import Dict, List, Sequence, Set
+
+
+def resolve_dependencies(tasks: Sequence) -> Dict[int, Set[int]]:
+    """Maps each task position to the positions of the tasks it depends on.
+
+    A dependency references a task by name or by 1-based position; a name wins when a
+    reference matches both. Raises ValueError for duplicate task names, unknown
+    references and dependency cycles."""
+    by_name = {}
+    for i, task in enumerate(tasks):
+        if task.name in by_name:
+            raise ValueError(f"Task name '{task.name}' is used more than once.")
+        by_name[task.name] = i
+    by_position = {str(i + 1): i for i in range(len(tasks))}
+
+    deps: Dict[int, Set[int]] = {}
+    for i, task in enumerate(tasks):
+        deps[i] = set()
+        for ref in task.dependencies or []:
+            ref = str(ref).strip()
+            j = by_name.get(ref, by_position.get(ref))
+            if j is None:
+                raise ValueError(f"Task '{task.name}' depends on unknown task '{ref}'.")
+            if j == i:
+                raise ValueError(f"Task '{task.name}' depends on itself.")
+            deps[i].add(j)
+    topological_order(tasks, deps)
+    return deps
+
+
+def canonical_dependencies(tasks: Sequence) -> List[List[str]]:
+    """The dependencies of each task as task names, the form SOPs are stored in, so a
+    reference means the same task however the SOP is later read."""
+    deps = resolve_dependencies(tasks)
+    return [[tasks[j].name for j in sorted(deps[i])] for i in range(len(tasks))]
+
+
+def topological_order(tasks: Sequence, deps: Dict[int, Set[int]]) -> List[int]:
+    remaining = {i: set(d) for i, d in deps.items()}
+    order = []
+    ready = sorted(i for i, d in remaining.items() if not d)
+    while ready:
+        i = ready.pop(0)
+        order.append(i)
+        for j, d in remaining.items():
+            if i in d:
+                d.discard(i)
+                if not d:
+                    ready.append(j)
+    if len(order) != len(tasks):
+        cyclic = [tasks[i].name for i in remaining if i not in order]
+        raise ValueError(f"SOP task dependencies contain a cycle: {cyclic}.")
+    return order
@@ -0,0 +1,137 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# BM25 parameters and the minimum score for an SOP to be recalled
+BM25_K1 = 1.5
+BM25_B = 0.75
+MIN_SCORE = float(os.getenv("SOP_RECALL_MIN_SCORE", "1.0"))
+
+_CJK_RUN = re.compile(r"[一-鿿]+")
+_WORD = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Chinese-aware tokenizer without a segmentation dictionary: runs of CJK characters
+    become overlapping bigrams (single characters for one-character runs), Latin text
+    and numbers become lowercase words."""
+    if not text:
+        return []
+    text = text.lower()
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_WORD.findall(text))
+    return tokens
+
+
+def sop_text(sop) -> str:
+    parts = [sop.name or "", sop.description or ""]
+    for task in sop.tasks:
+        parts.append(task.name or "")
+        parts.append(task.detail or "")
+    return "\n".join(parts)
+
+
+class BM25Index:
+    """Incremental in-memory BM25 index over SOP documents (inverted lists)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def add(self, doc_id: int, text: str):
+        """Adds or replaces a document."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove_locked(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = terms
+            self._doc_len[doc_id] = sum(terms.values())
+            self._total_len += self._doc_len[doc_id]
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def search(self, query_terms: Counter, top_k: int = 5) -> List[Tuple[int, float]]:
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs or 1.0
+            scores: Dict[int, float] = {}
+            for term, weight in query_terms.items():
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf * tf * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+
+
+_index: Optional[BM25Index] = None
+_init_lock = threading.Lock()
+
+
+def get_index() -> BM25Index:
+    global _index
+    if _index is None:
+        with _init_lock:
+            if _index is None:
+                from ..db import SessionLocal
+                from ..models import database as models
+                index = BM25Index()
+                db = SessionLocal()
+                try:
+                    for sop in db.query(models.SOP).all():
+                        index.add(sop.id, sop_text(sop))
+                finally:
+                    db.close()
+                _index = index
+    return _index
+
+
+def index_sop(sop):
+    """Incremental update after an SOP is created or edited."""
+    get_index().add(sop.id, sop_text(sop))
+
+
+def search(indicators: List[str], query: str = "", top_k: int = 5) -> List[Tuple[int, float]]:
+    """Ranks SOPs for the recognized indicators and the raw user query.
+    Indicator terms weigh twice as much as free query text."""
+    terms = Counter(tokenize(query))
+    for name in indicators:
+        for term in tokenize(name):
+            terms[term] += 2
+    return get_index().search(terms, top_k)
@@ -0,0 +1,84 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, column, func, select, table
+from sqlalchemy.sql import Select
+
+# Statement templates kept per (table, columns, filter shape)
+TEMPLATE_CACHE_SIZE = 1024
+
+# How the time column is restricted
+IN_PERIODS, BETWEEN, SINCE = "in", "between", "since"
+
+
+def _table(table_name: str, columns: Iterable[str]):
+    schema, _, name = table_name.rpartition(".")
+    return table(name, *(column(c) for c in dict.fromkeys(columns)), schema=schema or None)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _template(table_name: str, time_col: str, measures: Tuple[Tuple[str, str], ...],
+              dimensions: Tuple[Tuple[str, str], ...], filters: Tuple[str, ...], time_mode: Optional[str]) -> Select:
+    t = _table(table_name, [time_col] + [m for m, _ in measures] + [d for d, _ in dimensions] + list(filters))
+    period = t.c[time_col]
+    conditions = []
+    if time_mode == IN_PERIODS:
+        conditions.append(period.in_(bindparam("periods", expanding=True)))
+    elif time_mode == BETWEEN:
+        conditions.append(period.between(bindparam("start"), bindparam("end")))
+    elif time_mode == SINCE:
+        conditions.append(period >= bindparam("since"))
+    # Filter values are always bound, positionally named so the template only depends on the filter shape
+    conditions.extend(t.c[name].in_(bindparam(f"f{i}", expanding=True)) for i, name in enumerate(filters))
+    group_cols = [t.c[d] for d, _ in dimensions]
+    return (
+        select(
+            period.label("period"),
+            *(col.label(label) for col, (_, label) in zip(group_cols, dimensions)),
+            *(func.sum(t.c[m]).label(label) for m, label in measures),
+        )
+        .where(*conditions)
+        .group_by(period, *group_cols)
+    )
+
+
+def check_dimensions(indicator, names: Iterable[str]) -> List[str]:
+    """Only DIMENSION fields of the indicator may be grouped or filtered on."""
+    names = list(names)
+    allowed = {f.name for f in indicator.dimension_fields}
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown dimension(s) for indicator '{indicator.name}': {unknown}.")
+    return names
+
+
+def aggregate(indicator, target, measures: Sequence[Tuple[str, str]], dimensions: Sequence[Tuple[str, str]] = (),
+              filters: Optional[Dict[str, list]] = None, periods: Optional[Sequence[str]] = None,
+              time_range: Optional[Tuple[str, str]] = None, since: Optional[str] = None) -> Tuple[Select, dict]:
+    """Builds `SELECT period, <dimensions>, SUM(<measures>) ... GROUP BY period, <dimensions>`
+    against a query target (raw table or rollup) and returns it with its bound parameters.
+
+    measures and dimensions are (column, label) pairs; dimension and filter names are
+    checked against the indicator's DIMENSION fields, values never enter the SQL text.
+    """
+    filters = filters or {}
+    check_dimensions(indicator, [d for d, _ in dimensions] + list(filters))
+    params = {}
+    if periods is not None:
+        time_mode, params["periods"] = IN_PERIODS, list(periods)
+    elif time_range is not None:
+        time_mode, (params["start"], params["end"]) = BETWEEN, time_range
+    elif since is not None:
+        time_mode, params["since"] = SINCE, since
+    else:
+        time_mode = None
+    for i, values in enumerate(filters.values()):
+        params[f"f{i}"] = list(values)
+    statement = _template(
+        target.table, target.time_col, tuple(measures), tuple(dimensions), tuple(filters), time_mode
+    )
+    return statement, params
+
+
+def template_stats() -> dict:
+    info = _template.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
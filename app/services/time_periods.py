@@ -0,0 +1,157 @@
+import re
+from datetime import date, timedelta
+from typing import List, Optional
+
+# Supported granularities, from finest to coarsest
+DAY, WEEK, MONTH, QUARTER, YEAR = "day", "week", "month", "quarter", "year"
+GRAINS = [DAY, WEEK, MONTH, QUARTER, YEAR]
+
+DEFAULT_TIME_FORMAT = "yyyy-MM"
+
+# Java/SQL style pattern tokens used in IndicatorField.time_format (longest first)
+_TOKENS = [
+    ("yyyy", "year", r"\d{4}", 4),
+    ("YYYY", "year", r"\d{4}", 4),
+    ("MM", "month", r"\d{2}", 2),
+    ("dd", "day", r"\d{2}", 2),
+    ("ww", "week", r"\d{2}", 2),
+    ("q", "quarter", r"[1-4]", 1),
+]
+
+# Field combinations a time format may use; every period needs a year to be placed
+_VALID_FIELDS = {
+    frozenset(f) for f in (("year",), ("year", "quarter"), ("year", "month"), ("year", "week"),
+                           ("year", "month", "day"))
+}
+
+
+def _add_months(d: date, months: int) -> date:
+    total = d.year * 12 + d.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+class PeriodCodec:
+    """Parses, formats and shifts time values of one indicator's TIME field.
+
+    Periods are represented internally by the date they start on (ISO Monday for weeks).
+    Formats that cannot place a period in time (no year, day without month, repeated
+    fields) are rejected with ValueError when the codec is built.
+    """
+
+    def __init__(self, time_format: Optional[str] = None):
+        self.time_format = time_format or DEFAULT_TIME_FORMAT
+        self._parts = self._tokenize(self.time_format)
+        fields = [p[1] for p in self._parts if isinstance(p, tuple)]
+        if len(set(fields)) != len(fields) or frozenset(fields) not in _VALID_FIELDS:
+            raise ValueError(
+                f"Time format '{self.time_format}' must contain a year (yyyy) and at most one of "
+                "MM, MM+dd, ww or q, each once."
+            )
+        self._regex = re.compile("^" + "".join(
+            f"(?P<{p[1]}>{p[2]})" if isinstance(p, tuple) else re.escape(p) for p in self._parts
+        ) + "$")
+        names = set(fields)
+        if "day" in names:
+            self.grain = DAY
+        elif "week" in names:
+            self.grain = WEEK
+        elif "month" in names:
+            self.grain = MONTH
+        elif "quarter" in names:
+            self.grain = QUARTER
+        else:
+            self.grain = YEAR
+        # Fixed-width fields ordered coarse to fine: string order is chronological order
+        ranks = [{"year": 0, "quarter": 1, "month": 1, "week": 1, "day": 2}[p[1]]
+                 for p in self._parts if isinstance(p, tuple)]
+        self.sortable = ranks[:1] == [0] and ranks == sorted(ranks) and len(set(ranks)) == len(ranks)
+
+    @staticmethod
+    def _tokenize(fmt: str):
+        parts = []
+        i = 0
+        while i < len(fmt):
+            if fmt[i] == "'":
+                end = fmt.find("'", i + 1)
+                end = len(fmt) if end == -1 else end
+                parts.append(fmt[i + 1:end])
+                i = end + 1
+                continue
+            for token in _TOKENS:
+                if fmt.startswith(token[0], i):
+                    parts.append(token)
+                    i += len(token[0])
+                    break
+            else:
+                parts.append(fmt[i])
+                i += 1
+        return parts
+
+    def parse(self, value: str) -> date:
+        m = self._regex.match(str(value).strip())
+        if not m:
+            raise ValueError(f"Time value '{value}' does not match format '{self.time_format}'.")
+        g = m.groupdict()
+        year = int(g["year"])
+        if self.grain == DAY:
+            return date(year, int(g["month"]), int(g["day"]))
+        if self.grain == WEEK:
+            return date.fromisocalendar(year, int(g["week"]), 1)
+        if self.grain == MONTH:
+            return date(year, int(g["month"]), 1)
+        if self.grain == QUARTER:
+            return date(year, (int(g["quarter"]) - 1) * 3 + 1, 1)
+        return date(year, 1, 1)
+
+    def format(self, d: date) -> str:
+        if self.grain == WEEK:
+            year, week, _ = d.isocalendar()
+        else:
+            year, week = d.year, 0
+        values = {"year": year, "month": d.month, "day": d.day, "week": week,
+                  "quarter": (d.month - 1) // 3 + 1}
+        return "".join(
+            str(values[p[1]]).zfill(p[3]) if isinstance(p, tuple) else p for p in self._parts
+        )
+
+    def _shift(self, d: date, n: int) -> date:
+        if self.grain == DAY:
+            return d + timedelta(days=n)
+        if self.grain == WEEK:
+            return d + timedelta(weeks=n)
+        months = {MONTH: 1, QUARTER: 3, YEAR: 12}[self.grain]
+        return _add_months(d, n * months)
+
+    def shift(self, value: str, n: int) -> str:
+        return self.format(self._shift(self.parse(value), n))
+
+    def previous(self, value: str) -> str:
+        """The immediately preceding period (month-on-month for monthly data)."""
+        return self.shift(value, -1)
+
+    def year_ago(self, value: str) -> str:
+        """The same period one year earlier."""
+        d = self.parse(value)
+        if self.grain == DAY:
+            try:
+                return self.format(d.replace(year=d.year - 1))
+            except ValueError:  # Feb 29
+                return self.format(d.replace(year=d.year - 1, day=28))
+        if self.grain == WEEK:
+            year, week, _ = d.isocalendar()
+            weeks_last_year = date(year - 1, 12, 28).isocalendar()[1]
+            return self.format(date.fromisocalendar(year - 1, min(week, weeks_last_year), 1))
+        return self.format(_add_months(d, -12))
+
+    def periods_between(self, start: str, end: str) -> List[str]:
+        """All periods from start to end inclusive, in order."""
+        cur, last = self.parse(start), self.parse(end)
+        result = []
+        while cur <= last:
+            result.append(self.format(cur))
+            cur = self._shift(cur, 1)
+        return result
+
+
+def codec_for(time_field) -> PeriodCodec:
+    return PeriodCodec(time_field.time_format if time_field is not None else None)
@@ -14,6 +14,7 @@ from pydantic import BaseModel, Field
 from typing_extensions import Annotated, TypedDict
 from .manager import SkillManager
 from .models import Skill
+from ..services.llm_cache import LLMCache, llm_cache
 
 
 class AgentState(TypedDict):
@@ -36,7 +37,7 @@ You have access to tools that help you accomplish tasks. Think step by step:
 Always use tools when needed. Be thorough and systematic.
 """
     
-    def __init__(self, skills_dir: str, model_name: str = "deepseek-chat"):
+    def __init__(self, skills_dir: str, model_name: str = "deepseek-chat", cache: LLMCache = llm_cache):
         self.skill_manager = SkillManager(Path(skills_dir))
         self.skill_manager.discover_skills()
         self.custom_tools: List[BaseTool] = []
@@ -47,6 +48,8 @@ Always use tools when needed. Be thorough and systematic.
             raise ValueError("OPENAI_API_KEY environment variable is required.")
             
         self.llm = ChatDeepSeek(model=model_name, temperature=0)
+        # The model runs at temperature 0, so identical turns can be served from the cache
+        self.cache = cache
         self._graph = None
         
     def _create_skill_tools(self) -> List[BaseTool]:
@@ -104,6 +107,7 @@ Version: {skill.version}
         
         llm_with_tools = self.llm.bind_tools(all_tools)
         system_prompt = self.BASE_PROMPT
+        cache = self.cache
         
         def agent_node(state: AgentState) -> Dict:
             """Process messages and generate response."""
@@ -111,7 +115,7 @@ Version: {skill.version}
             # Ensure system message is first
             if not messages or not isinstance(messages[0], SystemMessage):
                 messages = [SystemMessage(content=system_prompt)] + messages
-            response = llm_with_tools.invoke(messages)
+            response = cache.invoke(llm_with_tools, messages, scope="skill_agent")
             return {"messages": [response]}
         
         def should_continue(state: AgentState) -> Literal["tools", "__end__"]:
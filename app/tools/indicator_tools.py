@@ -1,138 +1,473 @@
 from langchain.tools import tool
-from ..db import SessionLocal
-from ..models import database as models
-from ..services import metadata_service
-from sqlalchemy import create_engine
+from langchain_core.runnables import RunnableConfig
+from ..services import engine_registry, result_cache, io_executor, metrics, rollups, sql_builder
+from ..services.semantic_catalog import catalog_for, get_catalog
+from ..services.admission import deadline_of
+from ..services.time_periods import codec_for
+from ..services.single_flight import indicator_value_flight
+from ..services.result_store import result_store, owner_of, page, HANDLE_PATTERN
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
 import json
 
+# Upper bound on points returned by one trend query
+MAX_TREND_POINTS = 1000
+
+def _read_sql(query, engine, operation: str, params: dict = None, deadline: float = None) -> pd.DataFrame:
+    # Bounded by the statement timeout and by the deadline of the calling graph run
+    try:
+        with metrics.SQL_SECONDS.time(operation=operation), engine_registry.connect(engine, deadline) as conn:
+            df = pd.read_sql(query, conn, params=params)
+    except TimeoutError:
+        metrics.QUERY_TIMEOUTS.inc(scope="sql")
+        raise
+    metrics.SQL_ROWS.observe(len(df), operation=operation)
+    return df
+
 @tool
-def query_indicator_semantics(indicator_name: str) -> str:
+def query_indicator_semantics(indicator_name: str, config: RunnableConfig = None) -> str:
     """Queries the semantic information of an indicator by its name. 
     Returns basic info, fields, and relationships."""
-    db = SessionLocal()
-    try:
-        indicator = db.query(models.Indicator).filter(models.Indicator.name == indicator_name).first()
-        if not indicator:
-            return f"Indicator '{indicator_name}' not found."
-        
-        info = {
-            "name": indicator.name,
-            "synonyms": indicator.synonyms,
-            "unit": indicator.unit,
-            "evaluation_criteria": indicator.evaluation_criteria,
-            "formula": indicator.formula,
-            "fields": [
-                {
-                    "name": f.name,
-                    "type": f.data_type,
-                    "description": f.description,
-                    "role": f.field_role,
-                    "time_format": f.time_format
-                } for f in indicator.fields
-            ]
-        }
-        
-        # Get relationships (simplified)
-        children = db.query(models.Indicator).join(
-            models.IndicatorRelation, models.Indicator.id == models.IndicatorRelation.child_id
-        ).filter(models.IndicatorRelation.parent_id == indicator.id).all()
-        
-        parents = db.query(models.Indicator).join(
-            models.IndicatorRelation, models.Indicator.id == models.IndicatorRelation.parent_id
-        ).filter(models.IndicatorRelation.child_id == indicator.id).all()
-        
-        info["children"] = [c.name for c in children]
-        info["parents"] = [p.name for p in parents]
-        
-        return json.dumps(info, ensure_ascii=False, indent=2)
-    finally:
-        db.close()
+    catalog = catalog_for(config)
+    indicator = catalog.find(indicator_name)
+    if not indicator:
+        return f"Indicator '{indicator_name}' not found."
 
-@tool
-def query_indicator_value(indicator_name: str, time_value: str, dimension_filters: dict = None) -> str:
-    """Queries the value of an indicator for a specific time and dimensions.
-    Returns current value, YoY, MoM, and sub-indicator values.
-    time_value should be in the format specified by the indicator's time dimension (e.g., '2023-10').
-    dimension_filters is an optional dictionary of {dimension_name: value}."""
-    db = SessionLocal()
+    info = {
+        "name": indicator.name,
+        "synonyms": indicator.synonyms,
+        "unit": indicator.unit,
+        "evaluation_criteria": indicator.evaluation_criteria,
+        "formula": indicator.formula,
+        "fields": [
+            {
+                "name": f.name,
+                "type": f.data_type,
+                "description": f.description,
+                "role": f.field_role,
+                "time_format": f.time_format
+            } for f in indicator.fields
+        ],
+        "children": catalog.children_of(indicator),
+        "parents": catalog.parents_of(indicator),
+    }
+    return json.dumps(info, ensure_ascii=False, indent=2)
+
+async def _aquery_indicator_semantics(indicator_name: str, config: RunnableConfig = None) -> str:
+    # Catalog reads are in-memory, no need to leave the event loop
+    return query_indicator_semantics.func(indicator_name, config)
+
+query_indicator_semantics.coroutine = _aquery_indicator_semantics
+
+def _query_indicator_value(indicator_name: str, time_value: str, dimension_filters: dict, cache_key: tuple,
+                           deadline: float = None) -> str:
     try:
-        indicator = db.query(models.Indicator).filter(models.Indicator.name == indicator_name).first()
+        indicator = get_catalog().find(indicator_name)
         if not indicator:
             return f"Indicator '{indicator_name}' not found."
         
-        ds = indicator.data_source
-        if ds.db_type == "sqlite":
-            url = f"sqlite:///{ds.host}"
-        else:
-            url = f"{ds.db_type}://{ds.username}:{ds.password}@{ds.host}:{ds.port}/{ds.database}"
-        
-        engine = create_engine(url)
-        
-        # Find time field and measure field
-        time_field = next((f for f in indicator.fields if f.field_role == "TIME"), None)
-        measure_field = next((f for f in indicator.fields if f.field_role == "MEASURE"), None)
+        time_field, measure_field = indicator.time_field, indicator.measure_field
         
         if not time_field or not measure_field:
             return "Indicator definition missing TIME or MEASURE fields."
 
-        # Build query for current value
-        where_clause = f"WHERE {time_field.name} = '{time_value}'"
-        if dimension_filters:
-            for k, v in dimension_filters.items():
-                where_clause += f" AND {k} = '{v}'"
-        
-        query = f"SELECT SUM({measure_field.name}) as value FROM {indicator.table_name} {where_clause}"
-        df_current = pd.read_sql(query, engine)
-        current_val = df_current['value'].iloc[0] if not df_current.empty else None
-        
+        codec = codec_for(time_field)
+        try:
+            prev_time = codec.previous(time_value)
+            last_year_time = codec.year_ago(time_value)
+        except ValueError:
+            # Unrecognized time value: still answer the current value, without rates
+            prev_time = last_year_time = None
+
+        # Current, previous period and same period last year in a single grouped scan
+        periods = [p for p in dict.fromkeys([time_value, prev_time, last_year_time]) if p]
+        # Smallest pre-aggregated rollup able to answer, else the raw fact table
+        filters = {k: (list(v) if isinstance(v, (list, tuple)) else [v]) for k, v in (dimension_filters or {}).items()}
+        target = rollups.route(indicator, filters.keys(), periods)
+        query, params = sql_builder.aggregate(
+            indicator, target, [(target.measure_col, "value")], filters=filters, periods=periods
+        )
+        operation = "indicator_value_rollup" if target.rollup_id else "indicator_value"
+        df = _read_sql(query, target.engine, operation, params, deadline)
+        buckets = {str(p): v for p, v in zip(df["period"], df["value"]) if pd.notna(v)}
+
+        current_val = buckets.get(time_value)
         if current_val is None:
             return f"No data found for {indicator_name} at {time_value}."
 
-        # Calculate MoM (Month over Month) - simplified logic for demo
-        # Assuming yyyy-MM format
-        try:
-            cur_dt = datetime.strptime(time_value, "%Y-%m")
-            last_month_dt = (cur_dt.replace(day=1) - timedelta(days=1)).replace(day=1)
-            last_month_val_str = last_month_dt.strftime("%Y-%m")
-            
-            query_mom = f"SELECT SUM({measure_field.name}) as value FROM {indicator.table_name} WHERE {time_field.name} = '{last_month_val_str}'"
-            if dimension_filters:
-                for k, v in dimension_filters.items():
-                    query_mom += f" AND {k} = '{v}'"
-            df_mom = pd.read_sql(query_mom, engine)
-            mom_val = df_mom['value'].iloc[0] if not df_mom.empty else None
-            mom_rate = (current_val - mom_val) / mom_val if mom_val and mom_val != 0 else None
-        except:
-            mom_rate = None
-
-        # Calculate YoY (Year over Year)
-        try:
-            last_year_dt = cur_dt.replace(year=cur_dt.year - 1)
-            last_year_val_str = last_year_dt.strftime("%Y-%m")
-            query_yoy = f"SELECT SUM({measure_field.name}) as value FROM {indicator.table_name} WHERE {time_field.name} = '{last_year_val_str}'"
-            if dimension_filters:
-                for k, v in dimension_filters.items():
-                    query_yoy += f" AND {k} = '{v}'"
-            df_yoy = pd.read_sql(query_yoy, engine)
-            yoy_val = df_yoy['value'].iloc[0] if not df_yoy.empty else None
-            yoy_rate = (current_val - yoy_val) / yoy_val if yoy_val and yoy_val != 0 else None
-        except:
-            yoy_rate = None
+        def _rate(base):
+            return float((current_val - base) / base) if base else None
+
+        mom_rate = _rate(buckets.get(prev_time))
+        yoy_rate = _rate(buckets.get(last_year_time))
 
         result = {
-            "indicator": indicator_name,
+            "indicator": indicator.name,
             "time": time_value,
+            "grain": codec.grain,
             "unit": indicator.unit,
             "value": float(current_val),
             "mom_rate": mom_rate,
             "yoy_rate": yoy_rate,
             "evaluation": indicator.evaluation_criteria
         }
-        
-        return json.dumps(result, ensure_ascii=False, indent=2)
+
+        payload = json.dumps(result, ensure_ascii=False, indent=2)
+        result_cache.indicator_value_cache.put(
+            cache_key, payload, result_cache.ttl_for(indicator, codec, time_value),
+            indicator_id=indicator.id, data_source_id=indicator.data_source_id
+        )
+        return payload
     except Exception as e:
         return f"Error querying indicator value: {str(e)}"
-    finally:
-        db.close()
+
+@tool
+def query_indicator_value(indicator_name: str, time_value: str, dimension_filters: dict = None,
+                          config: RunnableConfig = None) -> str:
+    """Queries the value of an indicator for a specific time and dimensions.
+    Returns current value, YoY, MoM (period-over-period for daily/weekly/quarterly/yearly indicators).
+    time_value should be in the format specified by the indicator's time dimension (e.g., '2023-10').
+    dimension_filters is an optional dictionary of {dimension_name: value}."""
+    # Cached values are shared by all agents, so visibility is checked before the lookup
+    if not catalog_for(config).find(indicator_name):
+        return f"Indicator '{indicator_name}' not found."
+    cache_key = result_cache.make_key(indicator_name, time_value, dimension_filters)
+    cached = result_cache.indicator_value_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    # Concurrent identical questions share one database query
+    return indicator_value_flight.do(
+        cache_key,
+        lambda: _query_indicator_value(indicator_name, time_value, dimension_filters, cache_key, deadline_of(config))
+    )
+
+async def _aquery_indicator_value(indicator_name: str, time_value: str, dimension_filters: dict = None,
+                                  config: RunnableConfig = None) -> str:
+    if not catalog_for(config).find(indicator_name):
+        return f"Indicator '{indicator_name}' not found."
+    cache_key = result_cache.make_key(indicator_name, time_value, dimension_filters)
+    cached = result_cache.indicator_value_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await indicator_value_flight.ado(
+        cache_key,
+        lambda: _query_indicator_value(indicator_name, time_value, dimension_filters, cache_key, deadline_of(config)),
+        executor=io_executor.executor
+    )
+
+query_indicator_value.coroutine = _aquery_indicator_value
+
+def _lookup(series: pd.Series, keys: pd.DataFrame):
+    """Vectorized lookup of series values for each row of keys (missing -> NaN)."""
+    if keys.shape[1] == 1:
+        index = pd.Index(keys.iloc[:, 0])
+    else:
+        index = pd.MultiIndex.from_frame(keys)
+    return series.reindex(index).to_numpy(dtype=float)
+
+def _batch_scan(target, members, periods, dims, time_values, prev_map, year_ago_map, deadline=None) -> list:
+    """One grouped statement for several indicators of the same table (or one rollup);
+    returns the result rows with MoM/YoY computed by vectorized lookups."""
+    dim_names = list(dims)
+    query, params = sql_builder.aggregate(
+        members[0][0], target, [(measure, f"v{i}") for i, (_, measure) in enumerate(members)],
+        dimensions=[(d, d) for d in dim_names], filters=dims, periods=periods,
+    )
+    operation = "indicator_values_batch_rollup" if target.rollup_id else "indicator_values_batch"
+    df = _read_sql(query, target.engine, operation, params, deadline)
+    df["period"] = df["period"].astype(str)
+
+    rows = []
+    indexed = df.set_index(["period"] + dim_names)
+    current = df[df["period"].isin(time_values)]
+    prev_keys = current[dim_names].assign(period=current["period"].map(prev_map))[["period"] + dim_names]
+    year_ago_keys = current[dim_names].assign(period=current["period"].map(year_ago_map))[["period"] + dim_names]
+    for i, (indicator, _) in enumerate(members):
+        value = current[f"v{i}"].to_numpy(dtype=float)
+        prev_val = _lookup(indexed[f"v{i}"], prev_keys)
+        year_ago_val = _lookup(indexed[f"v{i}"], year_ago_keys)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mom = np.where(prev_val != 0, (value - prev_val) / prev_val, np.nan)
+            yoy = np.where(year_ago_val != 0, (value - year_ago_val) / year_ago_val, np.nan)
+        out = current[["period"] + dim_names].assign(value=value, mom_rate=mom, yoy_rate=yoy)
+        out = out[out["value"].notna()]
+        out.insert(0, "indicator", indicator.name)
+        out["period"] = pd.Categorical(out["period"], categories=time_values, ordered=True)
+        out = out.sort_values(["period"] + dim_names)
+        out = out.astype(object).where(out.notna(), None)
+        rows.extend(out.values.tolist())
+    return rows
+
+@tool
+def query_indicator_values_batch(indicator_names: list, time_values: list, dimension_filters: dict = None,
+                                 config: RunnableConfig = None) -> str:
+    """Queries many indicators for many time periods and dimension values in a single call.
+    Prefer this over calling query_indicator_value repeatedly for each indicator, period or region.
+    indicator_names is a list of indicator names; time_values is a list of periods in the indicators' time format (e.g., ['2023-09', '2023-10']).
+    dimension_filters is an optional dictionary of {dimension_name: value or list of values}; each listed dimension is broken down in the result.
+    Returns a compact table (columns + rows) with value, MoM and YoY for every indicator, time and dimension combination."""
+    dims = {k: (list(v) if isinstance(v, (list, tuple)) else [v]) for k, v in (dimension_filters or {}).items()}
+    dim_names = list(dims)
+    time_values = [str(t) for t in dict.fromkeys(time_values)]
+    catalog = catalog_for(config)
+    try:
+        errors = []
+        # Indicators reading the same table of the same data source share one statement
+        groups = {}
+        for name in dict.fromkeys(indicator_names):
+            indicator = catalog.find(name)
+            if not indicator:
+                errors.append(f"Indicator '{name}' not found.")
+                continue
+            time_field, measure_field = indicator.time_field, indicator.measure_field
+            if not time_field or not measure_field:
+                errors.append(f"Indicator '{name}' definition missing TIME or MEASURE fields.")
+                continue
+            key = (indicator.data_source_id, indicator.table_name, time_field.name, time_field.time_format)
+            group = groups.setdefault(key, {"time_field": time_field, "members": []})
+            group["members"].append((indicator, measure_field))
+
+        columns = ["indicator", "time"] + dim_names + ["value", "mom_rate", "yoy_rate"]
+        rows = []
+        for (_, table_name, time_col, _), group in groups.items():
+            members = group["members"]
+            codec = codec_for(group["time_field"])
+            prev_map, year_ago_map = {}, {}
+            for t in time_values:
+                try:
+                    prev_map[t], year_ago_map[t] = codec.previous(t), codec.year_ago(t)
+                except ValueError:
+                    prev_map[t] = year_ago_map[t] = None
+            periods = [p for p in dict.fromkeys(time_values + list(prev_map.values()) + list(year_ago_map.values())) if p]
+
+            # Indicators with a usable rollup read it on their own; the rest share one raw scan
+            scans, raw_members = [], []
+            for member in members:
+                target = rollups.route(member[0], dim_names, periods)
+                if target.rollup_id:
+                    scans.append((target, [(member[0], target.measure_col)]))
+                else:
+                    raw_members.append((member[0], member[1].name))
+            if raw_members:
+                target = rollups.QueryTarget(
+                    engine_registry.get_engine(members[0][0].data_source), table_name, time_col, None
+                )
+                scans.append((target, raw_members))
+
+            for target, scan_members in scans:
+                rows.extend(_batch_scan(target, scan_members, periods, dims, time_values, prev_map, year_ago_map,
+                                         deadline_of(config)))
+
+        result = {"columns": columns, "rows": rows}
+        if errors:
+            result["errors"] = errors
+        return json.dumps(result, ensure_ascii=False, default=str)
+    except Exception as e:
+        return f"Error querying indicator values: {str(e)}"
+
+async def _aquery_indicator_values_batch(indicator_names: list, time_values: list, dimension_filters: dict = None,
+                                         config: RunnableConfig = None) -> str:
+    return await io_executor.run_blocking(
+        query_indicator_values_batch.func, indicator_names, time_values, dimension_filters, config
+    )
+
+query_indicator_values_batch.coroutine = _aquery_indicator_values_batch
+
+@tool
+def analyze_indicator_contribution(indicator_name: str, base_time: str, compare_time: str,
+                                   dimension_filters: dict = None, top_n: int = 5,
+                                   config: RunnableConfig = None) -> str:
+    """Explains the change of an indicator between two periods by breaking it down along every DIMENSION field.
+    Use this for attribution questions ("why did sales drop?") instead of querying dimension values one by one.
+    base_time and compare_time are periods in the indicator's time format (e.g., '2023-09' and '2023-10').
+    dimension_filters is an optional dictionary of {dimension_name: value or list of values} restricting the scope.
+    Returns the overall change and, per dimension, the top_n members by absolute change with their share of the total change."""
+    try:
+        indicator = catalog_for(config).find(indicator_name)
+        if not indicator:
+            return f"Indicator '{indicator_name}' not found."
+        time_field, measure_field = indicator.time_field, indicator.measure_field
+        if not time_field or not measure_field:
+            return "Indicator definition missing TIME or MEASURE fields."
+        filters = {k: (list(v) if isinstance(v, (list, tuple)) else [v]) for k, v in (dimension_filters or {}).items()}
+        # Dimensions pinned to one value by the filters cannot explain anything
+        breakdown = [f.name for f in indicator.dimension_fields if len(filters.get(f.name, ())) != 1]
+        if not breakdown:
+            return f"Indicator '{indicator.name}' has no DIMENSION fields to break down."
+
+        base_time, compare_time = str(base_time), str(compare_time)
+        periods = [base_time, compare_time]
+        total, dimensions = None, {}
+        for dim in breakdown:
+            target = rollups.route(indicator, [dim] + list(filters), periods)
+            query, params = sql_builder.aggregate(
+                indicator, target, [(target.measure_col, "value")], dimensions=[(dim, "member")],
+                filters=filters, periods=periods,
+            )
+            operation = "indicator_contribution_rollup" if target.rollup_id else "indicator_contribution"
+            df = _read_sql(query, target.engine, operation, params, deadline_of(config))
+            df["period"] = df["period"].astype(str)
+            df["member"] = df["member"].fillna("(null)").astype(str)
+
+            pivot = df.pivot_table(index="member", columns="period", values="value", aggfunc="sum", fill_value=0.0)
+            pivot = pivot.reindex(columns=periods, fill_value=0.0).astype(float)
+            base, current = pivot[base_time].to_numpy(), pivot[compare_time].to_numpy()
+            if total is None:
+                total = (float(base.sum()), float(current.sum()))
+            delta = current - base
+            total_delta = total[1] - total[0]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rate = np.where(base != 0, delta / base, np.nan)
+                share = np.full_like(delta, np.nan) if total_delta == 0 else delta / total_delta
+            out = pd.DataFrame({
+                "member": pivot.index, "base": base, "compare": current,
+                "delta": delta, "rate": rate, "share": share,
+            })
+            top = out.iloc[np.argsort(-np.abs(delta), kind="stable")[:max(int(top_n), 1)]]
+            top = top.astype(object).where(top.notna(), None)
+            dimensions[dim] = {"members": len(out), "rows": top.values.tolist()}
+
+        base_total, compare_total = total
+        result = {
+            "indicator": indicator.name,
+            "unit": indicator.unit,
+            "base_time": base_time,
+            "compare_time": compare_time,
+            "base": base_total,
+            "compare": compare_total,
+            "delta": compare_total - base_total,
+            "rate": (compare_total - base_total) / base_total if base_total else None,
+            "columns": ["member", "base", "compare", "delta", "rate", "share"],
+            "dimensions": dimensions,
+        }
+        return json.dumps(result, ensure_ascii=False, default=str)
+    except Exception as e:
+        return f"Error analyzing indicator contribution: {str(e)}"
+
+async def _aanalyze_indicator_contribution(indicator_name: str, base_time: str, compare_time: str,
+                                           dimension_filters: dict = None, top_n: int = 5,
+                                           config: RunnableConfig = None) -> str:
+    return await io_executor.run_blocking(
+        analyze_indicator_contribution.func, indicator_name, base_time, compare_time, dimension_filters, top_n, config
+    )
+
+analyze_indicator_contribution.coroutine = _aanalyze_indicator_contribution
+
+def _query_indicator_trend(indicator_name: str, start_time: str, end_time: str, dimension_filters: dict,
+                           cache_key: tuple, deadline: float = None) -> str:
+    try:
+        indicator = get_catalog().find(indicator_name)
+        if not indicator:
+            return f"Indicator '{indicator_name}' not found."
+        time_field, measure_field = indicator.time_field, indicator.measure_field
+        if not time_field or not measure_field:
+            return "Indicator definition missing TIME or MEASURE fields."
+
+        codec = codec_for(time_field)
+        periods = codec.periods_between(start_time, end_time)
+        if not periods:
+            return f"Empty range: {start_time} is after {end_time}."
+        if len(periods) > MAX_TREND_POINTS:
+            return f"Range covers {len(periods)} {codec.grain}s, more than the limit of {MAX_TREND_POINTS}."
+        # One scan from a year before the start, so the first points also get MoM / YoY
+        axis = codec.periods_between(codec.year_ago(periods[0]), periods[-1])
+        filters = {k: (list(v) if isinstance(v, (list, tuple)) else [v]) for k, v in (dimension_filters or {}).items()}
+
+        target = rollups.route(indicator, filters.keys(), [axis[0], axis[-1]])
+        if codec.sortable:
+            range_args = {"time_range": (axis[0], axis[-1])}
+        else:
+            range_args = {"periods": axis}
+        query, params = sql_builder.aggregate(
+            indicator, target, [(target.measure_col, "value")], filters=filters, **range_args
+        )
+        operation = "indicator_trend_rollup" if target.rollup_id else "indicator_trend"
+        df = _read_sql(query, target.engine, operation, params, deadline)
+
+        # Missing periods stay on the axis with a null value
+        series = df.groupby(df["period"].astype(str))["value"].sum(min_count=1)
+        values = series.reindex(axis).to_numpy(dtype=float)
+        position = {p: i for i, p in enumerate(axis)}
+        offset = len(axis) - len(periods)
+        current = values[offset:]
+        prev = values[offset - 1:-1]
+        year_ago = values[[position[codec.year_ago(p)] for p in periods]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mom = np.where(prev != 0, (current - prev) / prev, np.nan)
+            yoy = np.where(year_ago != 0, (current - year_ago) / year_ago, np.nan)
+
+        def _column(arr):
+            return [None if np.isnan(x) else float(x) for x in arr]
+
+        result = {
+            "indicator": indicator.name,
+            "grain": codec.grain,
+            "unit": indicator.unit,
+            "time": periods,
+            "value": _column(current),
+            "mom_rate": _column(mom),
+            "yoy_rate": _column(yoy),
+        }
+        payload = json.dumps(result, ensure_ascii=False)
+        result_cache.indicator_value_cache.put(
+            cache_key, payload, result_cache.ttl_for(indicator, codec, periods[-1]),
+            indicator_id=indicator.id, data_source_id=indicator.data_source_id
+        )
+        return payload
+    except Exception as e:
+        return f"Error querying indicator trend: {str(e)}"
+
+def _trend_key(indicator_name: str, start_time: str, end_time: str, dimension_filters: dict) -> tuple:
+    return ("trend",) + result_cache.make_key(indicator_name, f"{start_time}..{end_time}", dimension_filters)
+
+@tool
+def query_indicator_trend(indicator_name: str, start_time: str, end_time: str, dimension_filters: dict = None,
+                          config: RunnableConfig = None) -> str:
+    """Queries the whole trend of an indicator between two periods (inclusive) in a single call.
+    Use this for questions like "the last 12 months" instead of calling query_indicator_value once per period.
+    start_time and end_time are periods in the indicator's time format; the granularity (day/week/month/quarter/year) follows that format.
+    dimension_filters is an optional dictionary of {dimension_name: value or list of values}.
+    Returns columnar arrays: time, value, mom_rate and yoy_rate (null where there is no data)."""
+    if not catalog_for(config).find(indicator_name):
+        return f"Indicator '{indicator_name}' not found."
+    cache_key = _trend_key(indicator_name, start_time, end_time, dimension_filters)
+    cached = result_cache.indicator_value_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return indicator_value_flight.do(
+        cache_key, lambda: _query_indicator_trend(indicator_name, start_time, end_time, dimension_filters, cache_key,
+                                                  deadline_of(config))
+    )
+
+async def _aquery_indicator_trend(indicator_name: str, start_time: str, end_time: str, dimension_filters: dict = None,
+                                  config: RunnableConfig = None) -> str:
+    if not catalog_for(config).find(indicator_name):
+        return f"Indicator '{indicator_name}' not found."
+    cache_key = _trend_key(indicator_name, start_time, end_time, dimension_filters)
+    cached = result_cache.indicator_value_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await indicator_value_flight.ado(
+        cache_key, lambda: _query_indicator_trend(indicator_name, start_time, end_time, dimension_filters, cache_key,
+                                                  deadline_of(config)),
+        executor=io_executor.executor
+    )
+
+query_indicator_trend.coroutine = _aquery_indicator_trend
+
+@tool
+def fetch_result(handle: str, offset: int = 0, config: RunnableConfig = None) -> str:
+    """Returns the data of an earlier tool result that was shortened to a handle such as [result:res_0123456789ab],
+    a page at a time: pass the offset given at the end of a page to read the next one.
+    Only call this when the summary shown with the handle is not enough."""
+    match = HANDLE_PATTERN.search(f"[result:{handle.strip().strip('[]').replace('result:', '')}]")
+    # Handles only resolve for the agent whose run stored them
+    content = result_store.get(match.group(1), owner_of(config)) if match else None
+    if content is None:
+        return f"Result '{handle}' is no longer available; run the query again."
+    return page(content, match.group(1), offset)
+
+async def _afetch_result(handle: str, offset: int = 0, config: RunnableConfig = None) -> str:
+    return fetch_result.func(handle, offset, config)
+
+fetch_result.coroutine = _afetch_result
@@ -0,0 +1,150 @@
+import importlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from dotenv import load_dotenv
+from .services import engine_registry, metrics, semantic_catalog, sop_index
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Off: warm up before serving (blocking startup), e.g. when the orchestrator has no readiness probe
+WARMUP_IN_BACKGROUND = os.getenv("WARMUP_IN_BACKGROUND", "true").lower() in ("1", "true", "yes")
+
+# Modules kept out of the import of app.main; each is attributed the time of whatever it
+# pulls in first, so the order matters for reading the breakdown
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "langchain_core.messages",
+    "langgraph.graph",
+    "langchain_openai",
+    ".tools.indicator_tools",
+    ".agents.indicator_agent",
+    ".agents.sessions",
+    ".agents.streaming",
+    ".agents.instrumentation",
+)
+
+
+class Warmup:
+    """Startup progress of this process: heavy imports and caches built in the background.
+
+    Requests arriving before it finishes are still served; they build what they need on
+    first use. Readiness only tells the load balancer when the first request will be fast."""
+
+    def __init__(self):
+        self.status = "starting"
+        self.imports: Dict[str, float] = {}
+        self.stages: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def record_import(self, module: str, seconds: float):
+        with self._lock:
+            self.imports[module] = round(seconds, 4)
+
+    def _stage(self, name: str, fn: Callable, required: bool = True):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.exception("Warmup stage %s failed", name)
+            with self._lock:
+                self.errors[name] = str(e)
+            if required:
+                raise
+        finally:
+            with self._lock:
+                self.stages[name] = round(time.perf_counter() - start, 4)
+
+    def _import_heavy(self):
+        for module in HEAVY_MODULES:
+            start = time.perf_counter()
+            importlib.import_module(module, __package__)
+            self.record_import(importlib.util.resolve_name(module, __package__), time.perf_counter() - start)
+
+    @staticmethod
+    def _open_pools():
+        # One connection per data source: driver import, DNS and authentication happen now
+        for ds in semantic_catalog.get_catalog().data_sources.values():
+            with engine_registry.get_engine(ds).connect():
+                pass
+
+    @staticmethod
+    def _build_graphs():
+        from .agents import graph_registry
+        graph_registry.warm()
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        try:
+            # Imports, metadata snapshots and connections are independent of each other
+            with ThreadPoolExecutor(max_workers=3, thread_name_prefix="warmup") as pool:
+                imports = pool.submit(self._stage, "imports", self._import_heavy)
+                catalog = pool.submit(self._stage, "catalog", semantic_catalog.get_catalog)
+                index = pool.submit(self._stage, "sop_index", sop_index.get_index)
+                catalog.result()
+                pools = pool.submit(self._stage, "engine_pools", self._open_pools, False)
+                imports.result()
+                index.result()
+                pools.result()
+            # Graphs need the agent modules and the catalog
+            self._stage("graphs", self._build_graphs)
+            self.status = "ready"
+        except Exception:
+            self.status = "failed"
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def start(self):
+        """Runs the warmup on a daemon thread (or inline when background warmup is off)."""
+        if not WARMUP_IN_BACKGROUND:
+            self.run()
+            return
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def report(self) -> dict:
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = round((self.finished_at or time.perf_counter()) - self.started_at, 4)
+            return {
+                "status": self.status,
+                "warmup_seconds": elapsed,
+                "imports": dict(self.imports),
+                "stages": dict(self.stages),
+                "errors": dict(self.errors),
+            }
+
+
+warmup = Warmup()
+
+
+def _startup_samples() -> dict:
+    report = warmup.report()
+    return {
+        **{(("kind", "import"), ("name", k)): v for k, v in report["imports"].items()},
+        **{(("kind", "stage"), ("name", k)): v for k, v in report["stages"].items()},
+    }
+
+
+metrics.GaugeCallback("startup_seconds", "Import and warmup stage durations of this process", _startup_samples)
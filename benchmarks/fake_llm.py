@@ -0,0 +1,77 @@
+"""Deterministic scripted chat model that stands in for ChatOpenAI / ChatDeepSeek in benchmarks."""
+import asyncio
+import json
+import re
+import time
+from typing import Any, List, Optional, Sequence
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+TIME_PATTERN = re.compile(r"\d{4}-\d{2}(?:-\d{2})?")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replies from simple rules instead of a network call, with a fixed simulated latency.
+
+    - indicator extraction prompts get a JSON list of the known indicators found in the text
+    - a pending tool result gets a final textual answer
+    - anything else gets one query_indicator_value tool call for the first known indicator
+    """
+
+    indicators: List[str] = []
+    latency: float = 0.0
+    default_time: str = "2023-10"
+    tokens_per_message: int = 50
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        text = str(last.content)
+        usage = {
+            "input_tokens": self.tokens_per_message * len(messages),
+            "output_tokens": self.tokens_per_message,
+            "total_tokens": self.tokens_per_message * (len(messages) + 1),
+        }
+        if text.startswith("Extract indicator names"):
+            found = [name for name in self.indicators if name in text]
+            return AIMessage(content=json.dumps(found, ensure_ascii=False), usage_metadata=usage)
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"根据查询结果: {text[:200]}", usage_metadata=usage)
+
+        question = " ".join(str(m.content) for m in messages)
+        name = next((n for n in self.indicators if n in question), self.indicators[0] if self.indicators else "")
+        match = TIME_PATTERN.search(question)
+        call_id = f"call_{len(messages)}_{abs(hash(question)) % 10 ** 8}"
+        return AIMessage(
+            content="",
+            tool_calls=[{
+                "name": "query_indicator_value",
+                "args": {"indicator_name": name, "time_value": match.group(0) if match else self.default_time},
+                "id": call_id,
+            }],
+            usage_metadata=usage,
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+def install(indicator_agent_module, model: ScriptedChatModel):
+    """Swaps the models used by app.agents.indicator_agent for the scripted one."""
+    indicator_agent_module.model = model
+    indicator_agent_module.model_with_tools = model
+    indicator_agent_module.sop_executor.model = model
@@ -0,0 +1,201 @@
+"""Offline benchmark suite: synthetic warehouse + scripted fake LLM, no network needed.
+
+    python -m benchmarks.run_benchmarks --rows 2000000 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --rows 2000000 --baseline benchmarks/baseline.json
+
+Reports p50/p95/p99 per scenario and, with --baseline, the change against a saved run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(samples: List[float], wall: float = None) -> Dict[str, float]:
+    arr = np.array(samples) * 1000
+    result = {
+        "n": len(samples),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+    }
+    if wall:
+        result["throughput_per_s"] = len(samples) / wall
+    return result
+
+
+def bench(fn: Callable[[int], object], iterations: int, warmup: int = 3) -> Dict[str, float]:
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def abench_concurrent(coro_fn, total: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await coro_fn(i)
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(samples, wall=time.perf_counter() - start)
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    lines = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            lines.append(f"{name:<40} (no baseline)")
+            continue
+        changes = []
+        regressed = False
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            ratio = current[key] / base[key] if base[key] else float("inf")
+            changes.append(f"{key[:3]} {ratio:5.2f}x")
+            regressed |= ratio > 1 + tolerance
+        lines.append(f"{name:<40} {'  '.join(changes)}{'  REGRESSION' if regressed else ''}")
+    return lines
+
+
+def run(args) -> Dict[str, dict]:
+    from app.db import SessionLocal, init_db
+    from app.services.result_cache import indicator_value_cache
+    from app.tools.indicator_tools import (
+        query_indicator_semantics, query_indicator_value, query_indicator_values_batch
+    )
+    from app.agents import indicator_agent
+    from app.main import app
+    from langchain_core.messages import HumanMessage
+    from .fake_llm import ScriptedChatModel, install
+    from .synthetic_data import generate_fact_table, register_metadata
+
+    if args.regenerate or not os.path.exists(args.warehouse):
+        print(f"Generating {args.rows} rows into {args.warehouse} ...")
+        generate_fact_table(args.warehouse, rows=args.rows)
+
+    if os.path.exists("indicator_agent.db"):
+        os.remove("indicator_agent.db")
+    init_db()
+    db = SessionLocal()
+    try:
+        register_metadata(db, args.warehouse, sops=args.sops)
+    finally:
+        db.close()
+
+    install(indicator_agent, ScriptedChatModel(indicators=["销售额", "销量", "日销售额"], latency=args.llm_latency))
+
+    rng = np.random.default_rng(7)
+    months = [f"{y}-{m:02d}" for y in range(2020, 2025) for m in range(1, 13)]
+    regions = [f"Region-{i:03d}" for i in range(10)]
+    picks = [(months[rng.integers(len(months))], regions[rng.integers(len(regions))]) for _ in range(10_000)]
+
+    def value_query(i, cold):
+        if cold:
+            indicator_value_cache.clear()
+        month, region = picks[i]
+        query_indicator_value.invoke({
+            "indicator_name": "销售额", "time_value": month, "dimension_filters": {"region": region}
+        })
+
+    def state(i):
+        month, _ = picks[i]
+        return {
+            "messages": [HumanMessage(content=f"销售额在{month}是多少")],
+            "indicators": [], "sop_id": None, "current_task_index": 0, "task_outputs": None,
+            "report": "",
+        }
+
+    results = {}
+    n = args.iterations
+    results["query_indicator_value.cold"] = bench(lambda i: value_query(i, True), n)
+    results["query_indicator_value.warm"] = bench(lambda i: value_query(i % 5, False), n, warmup=5)
+    results["query_indicator_values_batch"] = bench(lambda i: query_indicator_values_batch.invoke({
+        "indicator_names": ["销售额", "销量"], "time_values": months[i % 12:i % 12 + 12],
+        "dimension_filters": {"region": regions[:5]},
+    }), max(n // 5, 5))
+    results["semantic_lookup"] = bench(lambda i: query_indicator_semantics.invoke({"indicator_name": "营收"}), n * 10)
+    results["sop_recall"] = bench(lambda i: indicator_agent.sop_recall({
+        "indicators": ["销售额"], "messages": [HumanMessage(content="为什么销售额下滑了")],
+    }), n * 10)
+
+    indicator_value_cache.clear()
+    results["app_graph.ainvoke"] = asyncio.run(abench_concurrent(
+        lambda i: indicator_agent.app_graph.ainvoke(state(i)), args.requests, args.concurrency
+    ))
+
+    async def http_throughput():
+        import httpx
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def one(i):
+                month, _ = picks[i]
+                resp = await client.post("/query/", params={"query": f"销售额在{month}是多少", "agent_id": 1})
+                resp.raise_for_status()
+            return await abench_concurrent(one, args.requests, args.concurrency)
+
+    indicator_value_cache.clear()
+    results["http /query/"] = asyncio.run(http_throughput())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workdir", default="bench_data", help="Where the metadata and warehouse databases live")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the warehouse even if it exists")
+    parser.add_argument("--sops", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200, help="Graph / HTTP runs for the concurrent scenarios")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per LLM call")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    save_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    args.warehouse = os.path.abspath("warehouse.db")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    sys.path.insert(0, REPO_ROOT)
+
+    results = run(args)
+
+    print(f"\n{'scenario':<40} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'req/s':>8}")
+    for name, r in results.items():
+        throughput = f"{r['throughput_per_s']:8.1f}" if "throughput_per_s" in r else f"{'':>8}"
+        print(f"{name:<40} {r['n']:>6} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['p99_ms']:>10.3f} {throughput}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nAgainst baseline {baseline_path}:")
+        print("\n".join(compare(results, baseline, args.tolerance)))
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nBaseline saved to {save_path}")
+
+
+if __name__ == "__main__":
+    main()
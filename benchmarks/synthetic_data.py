@@ -0,0 +1,129 @@
+"""Scalable synthetic warehouse: a daily sales fact table plus matching indicator metadata and SOPs.
+
+    python -m benchmarks.synthetic_data --rows 5000000 --path bench_data/warehouse.db
+"""
+import argparse
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+CHANNELS = ["线上", "线下", "分销", "直营", "海外"]
+SOP_TOPICS = ["销售额", "销量", "客单价", "毛利", "库存", "退货率", "转化率", "复购率", "利润", "成本"]
+SOP_ACTIONS = ["下滑原因分析", "异常波动排查", "区域对比", "渠道拆解", "月度复盘", "同比诊断", "预算达成跟踪"]
+
+
+def generate_fact_table(path: str, rows: int = 1_000_000, regions: int = 50, products: int = 200,
+                        start: str = "2019-01-01", end: str = "2024-12-31", seed: int = 42,
+                        chunk_size: int = 500_000, with_indexes: bool = True):
+    """Writes `sales_daily(day, month, region, channel, product, sales_amount, quantity)`."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, end, freq="D")
+    region_names = np.array([f"Region-{i:03d}" for i in range(regions)])
+    product_names = np.array([f"SKU-{i:05d}" for i in range(products)])
+    channel_names = np.array(CHANNELS)
+    day_str = days.strftime("%Y-%m-%d").to_numpy()
+    month_str = days.strftime("%Y-%m").to_numpy()
+    # Yearly growth and seasonality so MoM / YoY are not pure noise
+    trend = 1 + 0.08 * (days.year.to_numpy() - days.year.min()) + 0.15 * np.sin(days.month.to_numpy() / 12 * 2 * np.pi)
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        written = 0
+        while written < rows:
+            n = min(chunk_size, rows - written)
+            d = rng.integers(0, len(days), n)
+            quantity = rng.integers(1, 50, n)
+            df = pd.DataFrame({
+                "day": day_str[d],
+                "month": month_str[d],
+                "region": region_names[rng.integers(0, regions, n)],
+                "channel": channel_names[rng.integers(0, len(channel_names), n)],
+                "product": product_names[rng.integers(0, products, n)],
+                "sales_amount": np.round(quantity * rng.uniform(10, 500, n) * trend[d], 2),
+                "quantity": quantity,
+            })
+            df.to_sql("sales_daily", conn, if_exists="append", index=False)
+            written += n
+        if with_indexes:
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sales_daily_month ON sales_daily(month)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sales_daily_day ON sales_daily(day)")
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def register_metadata(db, warehouse_path: str, sops: int = 1000, seed: int = 42):
+    """Registers the warehouse as a data source with monthly/daily indicators and `sops` SOPs."""
+    from app.schemas import schemas
+    from app.services import metadata_service
+
+    ds = metadata_service.create_data_source(db, schemas.DataSourceCreate(
+        name="synthetic_warehouse", db_type="sqlite", host=os.path.abspath(warehouse_path)
+    ))
+    dims = [
+        schemas.IndicatorFieldCreate(name=n, data_type="STRING", field_role="DIMENSION")
+        for n in ("region", "channel", "product")
+    ]
+
+    def fields(measure: str, time_col: str, time_format: str):
+        return [
+            schemas.IndicatorFieldCreate(name=measure, data_type="FLOAT", field_role="MEASURE"),
+            schemas.IndicatorFieldCreate(name=time_col, data_type="STRING", field_role="TIME", time_format=time_format),
+        ] + dims
+
+    definitions = [
+        ("销售额", "sales,营收,销售收入", "元", "sales_amount", "month", "yyyy-MM"),
+        ("销量", "quantity,销售数量", "件", "quantity", "month", "yyyy-MM"),
+        ("日销售额", "daily sales", "元", "sales_amount", "day", "yyyy-MM-dd"),
+    ]
+    indicator_ids = []
+    for name, synonyms, unit, measure, time_col, time_format in definitions:
+        indicator_ids.append(metadata_service.create_indicator(db, schemas.IndicatorCreate(
+            name=name, synonyms=synonyms, unit=unit, table_name="sales_daily",
+            data_source_id=ds.id, fields=fields(measure, time_col, time_format),
+        )).id)
+    # The agent queried by the benchmarks (agent_id 1 on a fresh metadata database)
+    metadata_service.create_agent(db, schemas.AgentCreate(
+        name="synthetic_analyst", description="Sales analyst over the synthetic warehouse", indicator_ids=indicator_ids,
+    ))
+
+    rng = np.random.default_rng(seed)
+    for i in range(sops):
+        topic = SOP_TOPICS[rng.integers(0, len(SOP_TOPICS))]
+        action = SOP_ACTIONS[rng.integers(0, len(SOP_ACTIONS))]
+        metadata_service.create_sop(db, schemas.SOPCreate(
+            name=f"{topic}{action}-{i}",
+            description=f"当{topic}出现{action}需求时执行的标准流程",
+            tasks=[
+                schemas.SOPTaskCreate(name="拉取数据", detail=f"查询{topic}的当期值、环比与同比"),
+                schemas.SOPTaskCreate(name="维度拆解", detail=f"按区域和渠道拆解{topic}"),
+                schemas.SOPTaskCreate(name="结论", detail="汇总分析结论", dependencies=["拉取数据", "维度拆解"]),
+            ],
+        ))
+    return ds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="bench_data/warehouse.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--regions", type=int, default=50)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--start", default="2019-01-01")
+    parser.add_argument("--end", default="2024-12-31")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-indexes", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.path) or ".", exist_ok=True)
+    generate_fact_table(args.path, args.rows, args.regions, args.products, args.start, args.end,
+                        args.seed, with_indexes=not args.no_indexes)
+    print(f"Synthetic warehouse with {args.rows} rows written to {os.path.abspath(args.path)}")
+
+
+if __name__ == "__main__":
+    main()
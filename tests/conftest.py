@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+import pytest
+
+# Local SQLite files the services open on import go to a scratch directory, not the working tree
+_scratch = tempfile.mkdtemp(prefix="sop_agent_tests_")
+for name, filename in (("SHARED_CACHE_PATH", "shared_cache.db"), ("SESSION_DB_PATH", "sessions.db"),
+                       ("LLM_CACHE_PATH", "llm_cache.db")):
+    os.environ.setdefault(name, os.path.join(_scratch, filename))
+os.environ.setdefault("ROLLUP_DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'rollups.db')}")
+# The agent module builds its ChatOpenAI client on import; tests never call it
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+@pytest.fixture
+def sales_warehouse(monkeypatch, tmp_path):
+    """SQLite data source with a monthly `sales` fact table (region and channel dimensions)
+    and the indicators GMV (SUM amount) and 订单量 (SUM orders) on it. The tools see it as
+    the catalog, read the raw table (no rollups) and start with an empty result cache.
+    Returns the warehouse engine, to check tool results against hand-written SQL."""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import database as models
+    from app.services import result_cache, rollups, semantic_catalog
+    from app.tools import indicator_tools
+
+    path = tmp_path / "warehouse.db"
+    warehouse = create_engine(f"sqlite:///{path}")
+    months = [f"{y}-{m:02d}" for y in (2023, 2024) for m in range(1, 13)][:15]
+    rows = []
+    for i, month in enumerate(months):
+        for r, region in enumerate(["East", "West", "North"]):
+            for c, channel in enumerate(["web", "store"]):
+                if (month, region, channel) == ("2024-02", "North", "store") or (month, region) == ("2023-02", "West"):
+                    continue
+                rows.append({"month": month, "region": region, "channel": channel,
+                             "amount": 100 + 7 * i + 13 * r * (i % 4) + 5 * c, "orders": 1 + i + r * c})
+    # Several rows per group, so the tools have to sum
+    rows.append({"month": "2024-01", "region": "East", "channel": "web", "amount": 40, "orders": 3})
+    with warehouse.begin() as conn:
+        conn.execute(text("CREATE TABLE sales (month TEXT, region TEXT, channel TEXT, amount REAL, orders INTEGER)"))
+        conn.execute(text("INSERT INTO sales VALUES (:month, :region, :channel, :amount, :orders)"), rows)
+
+    metadata = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(metadata)
+    db = sessionmaker(bind=metadata)()
+    db.add(models.DataSource(id=1, name="warehouse", db_type="sqlite", host=str(path)))
+    for indicator_id, name, measure in ((1, "GMV", "amount"), (2, "订单量", "orders")):
+        db.add(models.Indicator(id=indicator_id, name=name, data_source_id=1, table_name="sales", fields=[
+            models.IndicatorField(name="month", field_role="TIME", time_format="yyyy-MM"),
+            models.IndicatorField(name=measure, field_role="MEASURE"),
+            models.IndicatorField(name="region", field_role="DIMENSION"),
+            models.IndicatorField(name="channel", field_role="DIMENSION"),
+        ]))
+    db.commit()
+    catalog = semantic_catalog.build(db)
+    db.close()
+
+    monkeypatch.setattr(indicator_tools, "get_catalog", lambda: catalog)
+    monkeypatch.setattr(indicator_tools, "catalog_for", lambda config: catalog)
+    monkeypatch.setattr(rollups, "_rollups", {})
+    monkeypatch.setattr(rollups, "_loaded", True)
+    monkeypatch.setattr(result_cache, "indicator_value_cache", result_cache.TTLCache())
+    yield warehouse
+    indicator_tools.engine_registry.evict(1)
+    warehouse.dispose()
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import INTERACTIVE, SOP, AdmissionController, Overloaded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_agent_limit_does_not_block_other_agents():
+    async def main():
+        ctl = AdmissionController(max_concurrency=4, agent_max=1, lane_max={}, max_queue=10)
+        first = await ctl.acquire(1, INTERACTIVE)
+        queued = asyncio.ensure_future(ctl.acquire(1, INTERACTIVE, timeout=1))
+        await asyncio.sleep(0)
+        # Agent 1 is at its limit and waiting; agent 2 still gets one of the free slots
+        other = await asyncio.wait_for(ctl.acquire(2, INTERACTIVE, timeout=1), 0.5)
+        assert ctl.stats()["running_by_agent"] == {1: 1, 2: 1}
+        ctl.release(first)
+        second = await queued
+        ctl.release(second)
+        ctl.release(other)
+        assert ctl.stats()["running"] == 0
+
+    run(main())
+
+
+def test_interactive_waiters_are_served_before_sop():
+    async def main():
+        ctl = AdmissionController(max_concurrency=1, agent_max=5, lane_max={}, max_queue=10)
+        held = await ctl.acquire(1, INTERACTIVE)
+        order = []
+
+        async def waiter(agent_id, lane):
+            ticket = await ctl.acquire(agent_id, lane, timeout=1)
+            order.append(lane)
+            ctl.release(ticket)
+
+        tasks = [asyncio.ensure_future(waiter(2, SOP)), asyncio.ensure_future(waiter(3, INTERACTIVE))]
+        await asyncio.sleep(0)
+        ctl.release(held)
+        await asyncio.gather(*tasks)
+        assert order == [INTERACTIVE, SOP]
+
+    run(main())
+
+
+def test_lane_limit():
+    async def main():
+        ctl = AdmissionController(max_concurrency=4, agent_max=4, lane_max={SOP: 1}, max_queue=10)
+        await ctl.acquire(1, SOP)
+        with pytest.raises(Overloaded):
+            await ctl.acquire(2, SOP, timeout=0.01)
+        await asyncio.wait_for(ctl.acquire(2, INTERACTIVE), 0.5)
+        assert ctl.rejected[(SOP, "queue_timeout")] == 1
+
+    run(main())
+
+
+def test_full_queue_rejects_only_requests_that_would_wait():
+    async def main():
+        ctl = AdmissionController(max_concurrency=2, agent_max=1, lane_max={}, max_queue=1)
+        await ctl.acquire(1, INTERACTIVE)
+        waiting = asyncio.ensure_future(ctl.acquire(1, INTERACTIVE, timeout=1))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await ctl.acquire(1, INTERACTIVE)
+        ctl.check(INTERACTIVE, agent_id=2)
+        await asyncio.wait_for(ctl.acquire(2, INTERACTIVE), 0.5)
+        waiting.cancel()
+
+    run(main())
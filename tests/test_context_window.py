@@ -0,0 +1,70 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app.agents import context_window
+from app.agents.context_window import fit, message_tokens
+from app.services.result_store import ResultStore
+
+
+def call(call_id, name):
+    return AIMessage(content="", tool_calls=[{"id": call_id, "name": name, "args": {}}])
+
+
+@pytest.fixture
+def conversation(monkeypatch):
+    monkeypatch.setattr(context_window, "result_store", ResultStore())
+    return [
+        SystemMessage(content="You are an analyst."),
+        HumanMessage(content="GMV in January?"),
+        call("a", "query_indicator_value"),
+        ToolMessage(content="v" * 2000, tool_call_id="a", name="query_indicator_value"),
+        call("b", "query_indicator_semantics"),
+        ToolMessage(content="s" * 2000, tool_call_id="b", name="query_indicator_semantics"),
+        AIMessage(content="GMV was 1,200."),
+        HumanMessage(content="And in February?"),
+        call("c", "query_indicator_value"),
+        ToolMessage(content="w" * 2000, tool_call_id="c", name="query_indicator_value"),
+    ]
+
+
+def tokens(messages):
+    return sum(message_tokens(m) for m in messages)
+
+
+def elided(message):
+    return message_tokens(context_window._elide(message))
+
+
+def test_under_budget_is_unchanged(conversation):
+    assert fit(conversation, budget=tokens(conversation)) == conversation
+
+
+def test_trimming_order(conversation):
+    semantic, value = conversation[5], conversation[3]
+    after_semantic = tokens(conversation) - message_tokens(semantic) + elided(semantic)
+    after_values = after_semantic - message_tokens(value) + elided(value)
+
+    # 1. The metadata dump goes first
+    sent = fit(conversation, budget=after_semantic)
+    assert sent[5].content.startswith("[result:") and sent[3].content == value.content
+    # 2. Then older data outputs, still without dropping anything
+    sent = fit(conversation, budget=after_values)
+    assert len(sent) == len(conversation)
+    assert sent[3].content.startswith("[result:") and sent[5].content.startswith("[result:")
+    # 3. Then the oldest turns
+    sent = fit(conversation, budget=after_values - 1)
+    assert sent[0] == conversation[0] and sent[1].tool_calls[0]["id"] == "a"
+    assert len(sent) == len(conversation) - 1
+
+
+def test_system_latest_question_and_step_are_kept(conversation):
+    sent = fit(conversation, budget=1)
+    assert sent == [conversation[0]] + conversation[7:]
+    # The conversation itself is untouched
+    assert conversation[3].content == "v" * 2000
+
+
+def test_elided_outputs_stay_reachable(conversation):
+    sent = fit(conversation, budget=tokens(conversation) - 1, owner=7)
+    handle = context_window.handles_in(sent[5].content)[0]
+    assert context_window.result_store.get(handle, 7) == "s" * 2000
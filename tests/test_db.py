@@ -0,0 +1,21 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import init_db
+
+
+def test_init_db_adds_columns_missing_from_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # indicators as created before cache_ttl existed
+        conn.execute(text(
+            "CREATE TABLE indicators (id INTEGER PRIMARY KEY, name VARCHAR(255), synonyms TEXT, unit VARCHAR(50), "
+            "evaluation_criteria TEXT, formula TEXT, table_name VARCHAR(255), data_source_id INTEGER)"
+        ))
+        conn.execute(text("INSERT INTO indicators (id, name) VALUES (1, 'sales')"))
+
+    init_db(engine)
+    init_db(engine)  # Idempotent
+
+    assert "cache_ttl" in {c["name"] for c in inspect(engine).get_columns("indicators")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name, cache_ttl FROM indicators")).all() == [("sales", None)]
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from app.services.indicator_matcher import IndicatorMatcher
+
+
+def matcher(**synonyms):
+    indicators = {name: SimpleNamespace(name=name, synonym_list=terms) for name, terms in synonyms.items()}
+    return IndicatorMatcher(SimpleNamespace(indicators=indicators))
+
+
+def test_ascii_terms_match_whole_words_only():
+    m = matcher(GMV=["gmv"], 活跃用户=["DAU"])
+    assert m.match("GMVX trend and daus")[0] == []
+    assert m.match("what was gmv, and DAU?")[0] == ["GMV", "活跃用户"]
+    # CJK neighbours are boundaries for ASCII terms
+    assert m.match("上月GMV环比")[0] == ["GMV"]
+
+
+def test_cjk_terms_match_as_substrings():
+    m = matcher(毛利=[], 毛利率=[])
+    assert m.match("本月毛利率多少")[0] == ["毛利率"]
+    assert m.match("看看毛利情况")[0] == ["毛利"]
+
+
+def test_ascii_terms_inside_longer_words_are_skipped():
+    m = matcher(GMV=[], GMVX=[])
+    assert m.match("GMVXY and GMV")[0] == ["GMV"]
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.tools.indicator_tools import (
+    analyze_indicator_contribution, query_indicator_trend, query_indicator_values_batch,
+)
+
+MEASURES = {"GMV": "amount", "订单量": "orders"}
+MONTHS = [f"{y}-{m:02d}" for y in (2022, 2023, 2024) for m in range(1, 13)]
+PREVIOUS = dict(zip(MONTHS[1:], MONTHS))
+
+
+def total(warehouse, column, **where):
+    """The expected aggregate, written by hand."""
+    conditions = " AND ".join(f"{k} = :{k}" for k in where)
+    with warehouse.connect() as conn:
+        return conn.execute(text(f"SELECT SUM({column}) FROM sales WHERE {conditions}"), where).scalar()
+
+
+def rate(value, base):
+    return (value - base) / base if value is not None and base else None
+
+
+def year_ago(month):
+    return f"{int(month[:4]) - 1}{month[4:]}"
+
+
+def test_batch_values_match_sql(sales_warehouse):
+    times = ["2024-02", "2023-02", "2024-01"]
+    result = json.loads(query_indicator_values_batch.invoke({
+        "indicator_names": ["GMV", "订单量"], "time_values": times,
+        "dimension_filters": {"region": ["East", "West", "North"], "channel": "web"},
+    }))
+    assert result["columns"] == ["indicator", "time", "region", "channel", "value", "mom_rate", "yoy_rate"]
+
+    expected = []
+    for name, column in MEASURES.items():
+        for month in times:
+            for region in ["East", "North", "West"]:
+                value = total(sales_warehouse, column, month=month, region=region, channel="web")
+                if value is None:
+                    continue
+                prev = total(sales_warehouse, column, month=PREVIOUS[month], region=region, channel="web")
+                last_year = total(sales_warehouse, column, month=year_ago(month), region=region, channel="web")
+                expected.append([name, month, region, "web", value, rate(value, prev), rate(value, last_year)])
+    assert len(result["rows"]) == len(expected)
+    # 2023-02 has no West rows
+    assert ["GMV", "2023-02", "West"] not in [row[:3] for row in result["rows"]]
+    for row, want in zip(result["rows"], expected):
+        assert row[:4] == want[:4]
+        assert row[4:] == pytest.approx(want[4:])
+
+
+def test_batch_reports_unknown_indicators(sales_warehouse):
+    result = json.loads(query_indicator_values_batch.invoke({"indicator_names": ["GMV", "利润"], "time_values": ["2024-01"]}))
+    assert result["errors"] == ["Indicator '利润' not found."]
+    value = total(sales_warehouse, "amount", month="2024-01")
+    prev, last_year = total(sales_warehouse, "amount", month="2023-12"), total(sales_warehouse, "amount", month="2023-01")
+    assert result["rows"] == [["GMV", "2024-01", value, pytest.approx(rate(value, prev)), pytest.approx(rate(value, last_year))]]
+
+
+def test_contribution_matches_sql(sales_warehouse):
+    result = json.loads(analyze_indicator_contribution.invoke({
+        "indicator_name": "GMV", "base_time": "2024-01", "compare_time": "2024-02", "top_n": 2,
+    }))
+    base, compare = total(sales_warehouse, "amount", month="2024-01"), total(sales_warehouse, "amount", month="2024-02")
+    assert (result["base"], result["compare"]) == pytest.approx((base, compare))
+    assert result["delta"] == pytest.approx(compare - base)
+    assert list(result["dimensions"]) == ["region", "channel"]
+    for dim, members in (("region", ["East", "West", "North"]), ("channel", ["web", "store"])):
+        expected = []
+        for member in members:
+            b = total(sales_warehouse, "amount", month="2024-01", **{dim: member}) or 0.0
+            c = total(sales_warehouse, "amount", month="2024-02", **{dim: member}) or 0.0
+            expected.append([member, b, c, c - b, rate(c, b), (c - b) / (compare - base)])
+        expected.sort(key=lambda row: -abs(row[3]))
+        assert result["dimensions"][dim]["members"] == len(members)
+        assert [row[0] for row in result["dimensions"][dim]["rows"]] == [row[0] for row in expected[:2]]
+        for row, want in zip(result["dimensions"][dim]["rows"], expected):
+            assert row[1:] == pytest.approx(want[1:])
+
+
+def test_contribution_skips_dimensions_pinned_by_a_filter(sales_warehouse):
+    result = json.loads(analyze_indicator_contribution.invoke({
+        "indicator_name": "GMV", "base_time": "2024-01", "compare_time": "2024-02",
+        "dimension_filters": {"channel": "store"},
+    }))
+    assert list(result["dimensions"]) == ["region"]
+    assert result["compare"] == pytest.approx(total(sales_warehouse, "amount", month="2024-02", channel="store"))
+    north = dict((row[0], row) for row in result["dimensions"]["region"]["rows"])["North"]
+    # North has no store rows in 2024-02
+    assert north[2] == 0.0
+
+
+def test_trend_matches_sql(sales_warehouse):
+    months = MONTHS[MONTHS.index("2023-12"):MONTHS.index("2024-03") + 1]
+    result = json.loads(query_indicator_trend.invoke({
+        "indicator_name": "订单量", "start_time": months[0], "end_time": months[-1],
+        "dimension_filters": {"region": "West"},
+    }))
+    assert result["time"] == months
+    values = [total(sales_warehouse, "orders", month=m, region="West") for m in months]
+    prev = [total(sales_warehouse, "orders", month=PREVIOUS[m], region="West") for m in months]
+    last_year = [total(sales_warehouse, "orders", month=year_ago(m), region="West") for m in months]
+    assert result["value"] == pytest.approx(values)
+    assert result["mom_rate"] == pytest.approx([rate(v, b) for v, b in zip(values, prev)])
+    assert result["yoy_rate"] == pytest.approx([rate(v, b) for v, b in zip(values, last_year)])
+    # 2023-02 has no West rows
+    assert result["yoy_rate"][months.index("2024-02")] is None
+
+
+def test_trend_keeps_missing_periods_on_the_axis(sales_warehouse):
+    result = json.loads(query_indicator_trend.invoke({
+        "indicator_name": "GMV", "start_time": "2023-01", "end_time": "2023-03", "dimension_filters": {"region": ["West"]},
+    }))
+    january, march = (total(sales_warehouse, "amount", month=m, region="West") for m in ("2023-01", "2023-03"))
+    assert result["value"] == [january, None, march]
+    assert result["mom_rate"] == [None, None, None]
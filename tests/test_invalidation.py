@@ -0,0 +1,39 @@
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import database as models
+from app.services import invalidation
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    models.CacheEvent.__table__.create(engine)
+    return sessionmaker(bind=engine)()
+
+
+def add_event(db, created_at):
+    db.add(models.CacheEvent(kind="catalog", origin="other", created_at=created_at))
+    db.commit()
+
+
+def test_ids_are_not_reused_after_prune(monkeypatch):
+    db = make_session()
+    old = time.time() - invalidation.RETENTION_SECONDS - 10
+    add_event(db, old)
+    add_event(db, old)
+    monkeypatch.setattr(invalidation, "_last_id", 0)
+    invalidation.poll(db)
+    assert invalidation._last_id == 2
+
+    invalidation._prune(db)
+    assert [e.id for e in db.query(models.CacheEvent)] == [2]
+    db.query(models.CacheEvent).delete()
+    db.commit()
+
+    seen = []
+    monkeypatch.setitem(invalidation._handlers, "catalog", [lambda _db, key: seen.append(key)])
+    add_event(db, time.time())
+    assert invalidation.poll(db) == 1
+    assert invalidation._last_id == 3
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.services.llm_cache import LLMCache, MemoryBackend
+
+
+class CountingModel(BaseChatModel):
+    temperature: Optional[float] = None
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        usage = {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="answer", usage_metadata=usage))])
+
+
+class Recorder(BaseCallbackHandler):
+    def __init__(self):
+        self.starts: List[dict] = []
+        self.ends: List[Any] = []
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self.starts.append(metadata or {})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.ends.append(response.generations[0][0].message)
+
+
+MESSAGES = [HumanMessage(content="question")]
+
+
+def test_non_deterministic_models_are_not_cached():
+    cache = LLMCache(MemoryBackend())
+    model = CountingModel()
+    cache.invoke(model, MESSAGES)
+    cache.invoke(model, MESSAGES)
+    assert model.calls == 2
+
+
+def test_temperature_zero_calls_are_cached():
+    cache = LLMCache(MemoryBackend())
+    model = CountingModel(temperature=0)
+    assert cache.invoke(model, MESSAGES).content == "answer"
+    assert asyncio.run(cache.ainvoke(model, MESSAGES)).content == "answer"
+    assert model.calls == 1
+
+
+def test_hits_report_callbacks_without_tokens():
+    cache = LLMCache(MemoryBackend())
+    model = CountingModel(temperature=0)
+    cache.invoke(model, MESSAGES)
+    recorder = Recorder()
+    cache.invoke(model, MESSAGES, config={"callbacks": [recorder]})
+    asyncio.run(cache.ainvoke(model, MESSAGES, config={"callbacks": [recorder]}))
+    assert [s.get("llm_cache") for s in recorder.starts] == ["hit", "hit"]
+    assert [m.content for m in recorder.ends] == ["answer", "answer"]
+    assert all(m.usage_metadata is None for m in recorder.ends)
+
+
+def test_hits_inside_a_runnable_reach_its_callbacks():
+    from langchain_core.runnables import RunnableLambda
+
+    cache = LLMCache(MemoryBackend())
+    model = CountingModel(temperature=0)
+    cache.invoke(model, MESSAGES)
+    recorder = Recorder()
+    RunnableLambda(lambda _: cache.invoke(model, MESSAGES)).invoke(None, {"callbacks": [recorder]})
+    assert [s.get("llm_cache") for s in recorder.starts] == ["hit"]
@@ -0,0 +1,8 @@
+from app.services.metrics import Counter, REGISTRY
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_escaped_total", "Escaping test", ["tool"])
+    REGISTRY.remove(counter)
+    counter.inc(tool='a\\b"c\nd')
+    assert counter.render()[-1] == 'test_escaped_total{tool="a\\\\b\\"c\\nd"} 1'
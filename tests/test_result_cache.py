@@ -0,0 +1,11 @@
+from app.services.result_cache import make_key
+
+
+def test_scalar_and_one_element_list_filters_share_a_key():
+    assert make_key("GMV", "2024-05", {"region": "East"}) == make_key("GMV", "2024-05", {"region": ["East"]})
+
+
+def test_filter_order_and_duplicates_do_not_change_the_key():
+    key = make_key("GMV", "2024-05", {"region": ["West", "East"], "channel": "web"})
+    assert key == make_key("GMV", "2024-05", {"channel": ["web"], "region": ("East", "West", "East")})
+    assert key != make_key("GMV", "2024-05", {"region": ["East"], "channel": "web"})
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from app.services import result_store as rs
+from app.services.result_store import ResultStore, SharedResultStore, compact, handles_in, page
+
+
+@pytest.fixture(params=["memory", "shared"])
+def store(request, monkeypatch, tmp_path):
+    if request.param == "memory":
+        store = ResultStore(max_entries=10)
+    else:
+        from app.services.shared_store import SharedStore
+        monkeypatch.setattr(rs, "SharedStore", lambda table, n: SharedStore(table, n, path=str(tmp_path / "shared.db")))
+        store = SharedResultStore(max_entries=10)
+    monkeypatch.setattr(rs, "result_store", store)
+    return store
+
+
+def test_handles_only_resolve_for_their_owner(store):
+    handle = store.put("rows", owner=1)
+    assert store.get(handle, 1) == "rows"
+    assert store.get(handle, 2) is None
+    assert store.get(handle) is None
+    # The same content of another agent gets its own handle
+    assert store.put("rows", owner=2) != handle
+
+
+def test_compact_stores_for_the_owner(store):
+    content = json.dumps({"rows": list(range(500))})
+    compacted = compact(content, owner=3)
+    handle = handles_in(compacted)[0]
+    assert store.get(handle, 3) == content
+    assert store.get(handle, 4) is None
+
+
+def test_page():
+    assert page("short", "res_x") == "short"
+    first = page("a" * 10, "res_x", 0, size=4)
+    assert first.startswith("aaaa\n") and "offset 4" in first
+    last = page("a" * 10, "res_x", 8, size=4)
+    assert last.startswith("aa\n") and "offset" not in last
+
+
+def test_fetch_result_checks_the_agent_and_pages(monkeypatch):
+    from app.tools.indicator_tools import fetch_result
+
+    store = ResultStore()
+    monkeypatch.setattr("app.tools.indicator_tools.result_store", store)
+    monkeypatch.setattr(rs, "FETCH_PAGE_CHARS", 5)
+    handle = store.put("0123456789", owner=1)
+
+    def fetch(agent_id, **args):
+        return fetch_result.invoke({"handle": handle, **args}, {"configurable": {"agent_id": agent_id}})
+
+    assert "no longer available" in fetch(2)
+    assert fetch(1).startswith("01234\n")
+    assert fetch(1, offset=5).startswith("56789\n")
+
+
+def test_shared_store_creates_its_file_on_first_use(tmp_path):
+    from app.services.shared_store import SharedStore
+    path = tmp_path / "shared.db"
+    store = SharedStore("tool_results", 10, path=str(path))
+    assert store.size() == 0
+    assert not path.exists()
+    store.put("k", "v", ttl=60)
+    assert path.exists()
+    assert store.get("k") == "v"
@@ -0,0 +1,148 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rollups
+
+
+@pytest.fixture
+def indicator(monkeypatch):
+    indicator = SimpleNamespace(
+        id=1, table_name="sales", data_source=None,
+        time_field=SimpleNamespace(name="month", time_format="yyyy-MM"),
+        measure_field=SimpleNamespace(name="amount"),
+    )
+    rollup = rollups.RollupInfo(7, 1, "rollup_1_7", ("region",), "2024-12", 10)
+    monkeypatch.setattr(rollups, "_rollups", {1: (rollup,)})
+    monkeypatch.setattr(rollups, "_loaded", True)
+    monkeypatch.setattr(rollups.engine_registry, "get_engine", lambda ds: "raw")
+    monkeypatch.setattr(rollups, "store_engine", lambda: "store")
+    return indicator
+
+
+def test_closed_periods_use_the_rollup(indicator):
+    target = rollups.route(indicator, ["region"], ["2024-11", "2023-12"])
+    assert (target.engine, target.table, target.rollup_id) == ("store", "rollup_1_7", 7)
+
+
+def test_last_materialized_period_reads_the_raw_table(indicator):
+    target = rollups.route(indicator, ["region"], ["2024-12"])
+    assert (target.engine, target.table, target.rollup_id) == ("raw", "sales", None)
+
+
+def test_periods_compare_chronologically(indicator):
+    indicator.time_field.time_format = "MM/yyyy"
+    rollups._rollups[1] = (rollups.RollupInfo(7, 1, "rollup_1_7", (), "12/2024", 10),)
+    # Lexically "02/2025" < "12/2024", chronologically it is after
+    assert rollups.route(indicator, [], ["02/2025"]).rollup_id is None
+    assert rollups.route(indicator, [], ["02/2024"]).rollup_id == 7
+
+
+def test_unknown_dimension_or_bad_period_reads_the_raw_table(indicator):
+    assert rollups.route(indicator, ["product"], ["2024-01"]).rollup_id is None
+    assert rollups.route(indicator, [], ["2024-1"]).rollup_id is None
+
+
+@pytest.fixture
+def metadata_db(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import database as models
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(models.Indicator(id=1, name="sales", table_name="sales", fields=[
+        models.IndicatorField(name="month", field_role="TIME", time_format="yyyy-MM"),
+        models.IndicatorField(name="amount", field_role="MEASURE"),
+        models.IndicatorField(name="region", field_role="DIMENSION"),
+    ]))
+    db.add_all([
+        models.IndicatorRollup(id=1, indicator_id=1, dimensions=["region"], table_name="rollup_1_1"),
+        models.IndicatorRollup(id=2, indicator_id=1, dimensions=[], table_name="rollup_1_2"),
+    ])
+    db.commit()
+    # Refreshes reload the routing table; restored after the test
+    monkeypatch.setattr(rollups, "_rollups", {})
+    monkeypatch.setattr(rollups, "_loaded", False)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def warehouse(monkeypatch, tmp_path):
+    """SQLite source and rollup store for a real refresh of the metadata_db rollups."""
+    from sqlalchemy import create_engine, text
+
+    source = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    with source.begin() as conn:
+        conn.execute(text("CREATE TABLE sales (month TEXT, region TEXT, amount REAL)"))
+        conn.execute(text(
+            "INSERT INTO sales VALUES ('2024-01', 'East', 1), ('2024-01', 'West', 2), ('2024-02', 'East', 4)"
+        ))
+    indicator = SimpleNamespace(
+        id=1, name="sales", table_name="sales", data_source=None,
+        time_field=SimpleNamespace(name="month", time_format="yyyy-MM"),
+        measure_field=SimpleNamespace(name="amount"),
+        dimension_fields=(SimpleNamespace(name="region"),),
+    )
+    monkeypatch.setattr(rollups, "get_catalog", lambda: SimpleNamespace(by_id={1: indicator}))
+    monkeypatch.setattr(rollups.engine_registry, "get_engine", lambda ds: source)
+    store = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    monkeypatch.setattr(rollups, "store_engine", lambda: store)
+    return source
+
+
+def test_refresh_reads_the_source_through_the_statement_timeout(metadata_db, warehouse, monkeypatch):
+    connected = []
+    connect = rollups.engine_registry.connect
+
+    def recording_connect(engine, deadline=None):
+        connected.append(engine)
+        return connect(engine, deadline)
+
+    monkeypatch.setattr(rollups.engine_registry, "connect", recording_connect)
+    rollup = rollups.refresh_rollup(metadata_db, 1, full=True)
+    assert connected == [warehouse]
+    assert (rollup.last_period, rollup.row_count) == ("2024-02", 3)
+
+
+def test_refresh_all_keeps_going_after_a_failure(metadata_db, warehouse, monkeypatch):
+    refresh = rollups.refresh_rollup
+
+    def failing_first(db, rollup_id, full=False):
+        if rollup_id == 1:
+            raise TimeoutError("Statement stopped after 30.0s.")
+        return refresh(db, rollup_id, full)
+
+    monkeypatch.setattr(rollups, "refresh_rollup", failing_first)
+    refreshed, errors = rollups.refresh_all(metadata_db)
+    assert [r.id for r in refreshed] == [2]
+    assert errors == {1: "Statement stopped after 30.0s."}
+    assert refreshed[0].last_period == "2024-02"
+
+
+def test_removing_a_dimension_invalidates_the_rollups_using_it(metadata_db, warehouse):
+    from app.models import database as models
+
+    indicator = metadata_db.get(models.Indicator, 1)
+    region = next(f for f in indicator.fields if f.name == "region")
+    region.field_role = "MEASURE"
+    metadata_db.commit()
+    rollups.invalidate_indicator(metadata_db, 1)
+
+    by_id = {r.id: r for r in rollups.get_rollups(metadata_db, 1)}
+    assert "region" in by_id[1].invalid_reason
+    assert by_id[2].invalid_reason is None
+    with pytest.raises(ValueError):
+        rollups.refresh_rollup(metadata_db, 1)
+    refreshed, errors = rollups.refresh_all(metadata_db)
+    assert ([r.id for r in refreshed], errors) == ([2], {})
+
+    # Valid again once the dimension is back
+    region.field_role = "DIMENSION"
+    metadata_db.commit()
+    rollups.invalidate_indicator(metadata_db, 1)
+    assert rollups.get_rollups(metadata_db, 1)[0].invalid_reason is None
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_do_coalesces_concurrent_threads():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert results == [42, 42]
+    assert calls == [1]
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "shared": 1}
+
+
+def test_do_shares_exceptions():
+    flight = SingleFlight()
+
+    def work():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", work)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_ado_coalesces_and_shares_exceptions():
+    flight = SingleFlight()
+
+    def work():
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("k", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.executions == 1
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "value"
+    assert flight.executions == 1
+    assert flight._async_calls == {}
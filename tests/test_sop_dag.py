@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.sop_dag import canonical_dependencies, resolve_dependencies, topological_order
+
+
+def task(name, dependencies=None, id=None):
+    return SimpleNamespace(name=name, dependencies=dependencies, id=id)
+
+
+def test_references_by_name_and_position():
+    tasks = [task("A"), task("B", ["A"]), task("C", ["1", "B"])]
+    deps = resolve_dependencies(tasks)
+    assert deps == {0: set(), 1: {0}, 2: {0, 1}}
+    assert topological_order(tasks, deps) == [0, 1, 2]
+
+
+def test_position_wins_over_a_coinciding_id():
+    # Ids are global autoincrement values, unknown when the SOP is written: "1" and "2"
+    # are positions even though tasks with those ids exist
+    tasks = [task("A", id=2), task("B", ["1"], id=1), task("C", ["2"], id=3)]
+    assert resolve_dependencies(tasks) == {0: set(), 1: {0}, 2: {1}}
+
+
+def test_name_wins_over_position():
+    tasks = [task("A"), task("1", ["A"]), task("C", ["1"])]
+    assert resolve_dependencies(tasks)[2] == {1}
+
+
+def test_canonical_dependencies_are_task_names():
+    tasks = [task("A"), task("B", ["1"]), task("C", ["B", "1"])]
+    assert canonical_dependencies(tasks) == [[], ["A"], ["A", "B"]]
+
+
+def test_duplicate_task_names_are_rejected():
+    with pytest.raises(ValueError, match="more than once"):
+        resolve_dependencies([task("A"), task("A")])
+
+
+def test_unknown_reference_and_cycle():
+    with pytest.raises(ValueError, match="unknown task 'X'"):
+        resolve_dependencies([task("A", ["X"])])
+    with pytest.raises(ValueError, match="cycle"):
+        resolve_dependencies([task("A", ["B"]), task("B", ["A"])])
+
+
+def test_executor_reports_bad_dependencies_as_task_errors():
+    import asyncio
+
+    from app.agents.sop_executor import SOPExecutor
+
+    executor = SOPExecutor(model=None, tools=[])
+    tasks = [task("A", ["A"])]
+    assert executor.run(tasks, "q", [])["A"].startswith("Task failed:")
+    assert asyncio.run(executor.arun(tasks, "q", []))["A"].startswith("Task failed:")
+
+
+def test_create_sop_stores_dependencies_as_task_names():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import database as models
+    from app.schemas import schemas
+    from app.services import metadata_service
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    def sop(name):
+        return schemas.SOPCreate(name=name, description="", report_template="", tasks=[
+            schemas.SOPTaskCreate(name="A", detail=""),
+            schemas.SOPTaskCreate(name="B", detail="", dependencies=["1"]),
+            schemas.SOPTaskCreate(name="C", detail="", dependencies=["2", "A"]),
+        ])
+
+    metadata_service.create_sop(db, sop("first"))
+    second = metadata_service.create_sop(db, sop("second"))
+    # The second SOP's tasks have ids 4..6; "1" and "2" still mean its own first tasks
+    assert [t.dependencies for t in second.tasks] == [[], ["A"], ["A", "B"]]
+    assert resolve_dependencies(second.tasks) == {0: set(), 1: {0}, 2: {0, 1}}
@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.agents import indicator_agent
+from app.agents.sop_executor import SOPExecutor
+
+
+def task(name, dependencies=()):
+    return SimpleNamespace(name=name, dependencies=list(dependencies), tools=[], detail="")
+
+
+TASKS = [task("A"), task("B"), task("C", ["A", "B"])]
+
+
+class RecordingExecutor(SOPExecutor):
+    def __init__(self, fail=()):
+        super().__init__(model=None, tools=[])
+        self.calls = []
+        self.fail = set(fail)
+
+    def run_task(self, task, question, indicators, upstream, config=None):
+        self.calls.append(task.name)
+        if task.name in self.fail:
+            raise KeyboardInterrupt  # The process stops mid-run, not a task error
+        return f"{task.name}<{','.join(upstream.values())}>"
+
+    async def arun_task(self, task, question, indicators, upstream, config=None):
+        return self.run_task(task, question, indicators, upstream, config)
+
+
+def test_finished_tasks_are_skipped_and_feed_downstream():
+    executor = RecordingExecutor()
+    outputs = executor.run(TASKS, "q", [], done={"A": "a", "B": "b"})
+    assert outputs == {"C": "C<a,b>"}
+    assert executor.calls == ["C"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_one_wave_runs_only_ready_tasks(use_async):
+    executor = RecordingExecutor()
+    if use_async:
+        outputs = asyncio.run(executor.arun(TASKS, "q", [], one_wave=True))
+    else:
+        outputs = executor.run(TASKS, "q", [], one_wave=True)
+    assert outputs == {"A": "A<>", "B": "B<>"}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    executor = RecordingExecutor(fail={"C"})
+    monkeypatch.setattr(indicator_agent, "sop_executor", executor)
+    monkeypatch.setattr(indicator_agent, "_load_sop_tasks", lambda sop_id: TASKS)
+    monkeypatch.setattr(indicator_agent, "catalog_for", lambda config: None)
+    monkeypatch.setattr(indicator_agent, "match_indicators",
+                        lambda text, catalog: (["销售额"], []) if "销售额" in text else ([], []))
+    monkeypatch.setattr(indicator_agent.sop_index, "search", lambda indicators, query, top_k=5: [(7, 10.0)])
+    monkeypatch.setattr(indicator_agent, "expand", lambda report, owner=None: report)
+    return indicator_agent.workflow.compile(checkpointer=MemorySaver()), executor
+
+
+def test_interrupted_sop_run_resumes_on_follow_up(graph):
+    graph, executor = graph
+    config = {"configurable": {"thread_id": "t"}}
+    with pytest.raises(KeyboardInterrupt):
+        graph.invoke({"messages": [("user", "分析销售额")]}, config)
+    state = graph.get_state(config).values
+    assert state["sop_id"] == 7
+    assert state["current_task_index"] == 2
+    assert state["task_outputs"] == {"A": "A<>", "B": "B<>"}
+
+    executor.fail.clear()
+    executor.calls.clear()
+    final = graph.invoke({"messages": [("user", "继续")]}, config)
+    assert executor.calls == ["C"]
+    assert final["task_outputs"] is None
+    assert final["current_task_index"] == 3
+    assert "## C\nC<A<>,B<>>" in final["messages"][-1].content
+
+
+def test_new_question_on_the_same_sop_reruns_it(graph):
+    graph, executor = graph
+    executor.fail.clear()
+    config = {"configurable": {"thread_id": "t2"}}
+    graph.invoke({"messages": [("user", "分析销售额")]}, config)
+    executor.calls.clear()
+    graph.invoke({"messages": [("user", "再分析一次销售额")]}, config)
+    assert sorted(executor.calls) == ["A", "B", "C"]
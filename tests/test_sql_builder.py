@@ -0,0 +1,47 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app.services import sql_builder
+from app.tools.indicator_tools import query_indicator_value
+
+INDICATOR = SimpleNamespace(name="GMV", dimension_fields=(SimpleNamespace(name="region"),))
+TARGET = SimpleNamespace(table="sales", time_col="month")
+
+
+def test_only_dimension_fields_can_be_grouped_or_filtered():
+    with pytest.raises(ValueError, match=r"\['amount'\]"):
+        sql_builder.aggregate(INDICATOR, TARGET, [("amount", "value")], dimensions=[("amount", "amount")])
+    with pytest.raises(ValueError, match="region; DROP TABLE sales"):
+        sql_builder.aggregate(INDICATOR, TARGET, [("amount", "value")], filters={"region; DROP TABLE sales": ["x"]})
+
+
+def test_filter_values_are_bound_not_inlined():
+    query, params = sql_builder.aggregate(
+        INDICATOR, TARGET, [("amount", "value")], filters={"region": ["East' OR '1'='1"]}, periods=["2024-01"]
+    )
+    assert "East" not in str(query)
+    assert params == {"periods": ["2024-01"], "f0": ["East' OR '1'='1"]}
+
+
+def test_tool_rejects_unknown_dimensions(sales_warehouse):
+    reply = query_indicator_value.invoke({
+        "indicator_name": "GMV", "time_value": "2024-01", "dimension_filters": {"1=1; DROP TABLE sales; --": "x"},
+    })
+    assert reply.startswith("Error querying indicator value: Unknown dimension(s)")
+    with sales_warehouse.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM sales")).scalar() > 0
+
+
+def test_tool_filter_values_match_literally(sales_warehouse):
+    reply = query_indicator_value.invoke({
+        "indicator_name": "GMV", "time_value": "2024-01", "dimension_filters": {"region": "East' OR '1'='1"},
+    })
+    assert reply == "No data found for GMV at 2024-01."
+    value = json.loads(query_indicator_value.invoke({
+        "indicator_name": "GMV", "time_value": "2024-01", "dimension_filters": {"region": "East"},
+    }))["value"]
+    with sales_warehouse.connect() as conn:
+        assert value == conn.execute(text("SELECT SUM(amount) FROM sales WHERE month = '2024-01' AND region = 'East'")).scalar()
@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from app.services.time_periods import DAY, MONTH, QUARTER, WEEK, YEAR, PeriodCodec, codec_for
+
+
+@pytest.mark.parametrize("fmt, grain, value, start", [
+    ("yyyy-MM", MONTH, "2024-03", date(2024, 3, 1)),
+    ("yyyyMMdd", DAY, "20240229", date(2024, 2, 29)),
+    ("yyyy-'W'ww", WEEK, "2024-W01", date(2024, 1, 1)),
+    ("yyyy'Q'q", QUARTER, "2024Q2", date(2024, 4, 1)),
+    ("yyyy", YEAR, "2024", date(2024, 1, 1)),
+])
+def test_parse_and_format_round_trip(fmt, grain, value, start):
+    codec = PeriodCodec(fmt)
+    assert codec.grain == grain
+    assert codec.parse(value) == start
+    assert codec.format(start) == value
+
+
+def test_default_format():
+    assert codec_for(None).time_format == "yyyy-MM"
+
+
+def test_previous_and_year_ago():
+    month = PeriodCodec("yyyy-MM")
+    assert month.previous("2024-01") == "2023-12"
+    assert month.year_ago("2024-01") == "2023-01"
+    day = PeriodCodec("yyyy-MM-dd")
+    assert day.year_ago("2024-02-29") == "2023-02-28"
+    week = PeriodCodec("yyyy-ww")
+    assert week.year_ago("2021-01") == "2020-01"
+    # 2026 has 53 ISO weeks, 2025 only 52
+    assert week.year_ago("2026-53") == "2025-52"
+    assert PeriodCodec("yyyy'Q'q").previous("2024Q1") == "2023Q4"
+
+
+def test_periods_between():
+    codec = PeriodCodec("yyyy-MM")
+    assert codec.periods_between("2023-11", "2024-02") == ["2023-11", "2023-12", "2024-01", "2024-02"]
+    assert codec.periods_between("2024-02", "2024-01") == []
+
+
+def test_sortable():
+    assert PeriodCodec("yyyy-MM").sortable
+    assert not PeriodCodec("MM/yyyy").sortable
+
+
+def test_unparseable_values_raise_value_error():
+    codec = PeriodCodec("yyyy-MM")
+    for value in ("2024-3", "2024-13", "March 2024"):
+        with pytest.raises(ValueError):
+            codec.parse(value)
+
+
+@pytest.mark.parametrize("fmt", ["MM", "q", "dd", "yyyy-dd", "yyyy-MM-MM", "yyyy-MM-ww", "yyyy-yyyy"])
+def test_formats_that_cannot_place_a_period_are_rejected(fmt):
+    with pytest.raises(ValueError):
+        PeriodCodec(fmt)
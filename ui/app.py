@@ -1,8 +1,12 @@
 import streamlit as st
 import requests
 import json
+import uuid
 
 BASE_URL = "http://localhost:8000"
+# Only this node's LLM tokens are the answer; recognition, SOP selection and SOP task
+# tokens are not shown (SOP runs deliver their report in the final event)
+ANSWER_NODE = "general_agent"
 
 st.set_page_config(page_title="Indicator AI Agent System", layout="wide")
 st.title("📊 Indicator AI Agent System")
@@ -17,16 +21,43 @@ with tabs[0]:
         agent_names = [a["name"] for a in agents]
         selected_agent_name = st.selectbox("选择 Agent", agent_names)
         selected_agent = next(a for a in agents if a["name"] == selected_agent_name)
+        # Follow-up questions continue the same server-side session until a new one is started
+        # Rendered on every run, also the first one, so the button is always on the page
+        new_conversation = st.button("新对话")
+        if "session_id" not in st.session_state or new_conversation:
+            st.session_state["session_id"] = uuid.uuid4().hex
         
         user_query = st.text_input("输入你的问题 (例如: 查询销售额在2023-10的数据)")
         if st.button("发送"):
-            with st.spinner("Agent 正在思考..."):
-                resp = requests.post(f"{BASE_URL}/query/", params={"query": user_query, "agent_id": selected_agent["id"]}).json()
-                st.markdown("### 结果")
-                st.write(resp["result"])
-                with st.expander("执行过程"):
-                    for msg in resp["history"]:
-                        st.text(msg)
+            st.markdown("### 结果")
+            answer_box = st.empty()
+            process = st.expander("执行过程", expanded=True)
+            answer = ""
+            # Render node transitions, tool calls and LLM tokens as they arrive (SSE)
+            with requests.post(f"{BASE_URL}/query/stream", params={"query": user_query, "agent_id": selected_agent["id"], "session_id": st.session_state["session_id"]}, stream=True) as resp:
+                if resp.status_code != 200:
+                    # Unknown agent, full queue (503 + Retry-After), ...
+                    st.error(f"请求失败: {resp.text}")
+                    st.stop()
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[len("data: "):])
+                    if event["type"] == "node_start":
+                        process.markdown(f"▶️ `{event['node']}`")
+                        if event["node"] == ANSWER_NODE:
+                            answer = ""
+                    elif event["type"] == "tool_call":
+                        process.markdown(f"🔧 调用工具 `{event['tool']}`: `{json.dumps(event['args'], ensure_ascii=False)}`")
+                    elif event["type"] == "tool_result":
+                        process.text(str(event["content"]))
+                    elif event["type"] == "token" and event.get("node") == ANSWER_NODE:
+                        answer += event["content"]
+                        answer_box.markdown(answer)
+                    elif event["type"] == "done":
+                        answer_box.markdown(event["result"])
+                    elif event["type"] == "error":
+                        st.error(event["message"])
     else:
         st.warning("请先在 'Agent 创建' 选项卡中创建一个 Agent。")
 